@@ -0,0 +1,593 @@
+"""
+    Lightweight physics engine for large swarms.
+
+    DiscWorld implements the part of the pybox2d world and body interface
+    the simulator uses (CreateDynamicBody, CreateStaticBody, DestroyBody,
+    Step, body.position, body.GetWorldPoint, ...), so Kilobot, Object,
+    Labyrinth and PushingWorld run on it unchanged. See PhysicsBackends.
+
+    Every body has a single shape: a disc or a box. The state of all bodies
+    is kept in NumPy arrays and a step is computed for all of them at once:
+
+        velocities are damped like in Box2D, positions are integrated, then
+        overlaps are removed by positionIterations rounds of position
+        projection (Jacobi, weighted by inverse mass and inertia) and the
+        velocities are derived from the resulting movement.
+
+    Contacts are disc - disc (candidate pairs from a SpatialHash, reused
+    until a disc moved more than half the skin), disc - box and box corner
+    - box. Contacts are frictionless and there is no restitution, no
+    gravity, no sleeping and no continuous collision detection, the solver
+    iterations for velocities are ignored. This is much cheaper than the
+    Box2D contact solver but pushing is less accurate, use it for large
+    swarms where speed matters more than exact frictional contact.
+"""
+
+from Box2D.b2 import vec2, polygonShape, circleShape
+
+import numpy as np
+
+from SpatialHash import SpatialHash
+
+
+class DiscFixture:
+    def __init__(self, body, shape, density, friction, restitution):
+        self.body = body
+        self.shape = shape
+        self.density = density
+        self.friction = friction
+        self.restitution = restitution
+
+
+class DiscTransform:
+    def __init__(self, position, angle):
+        self.position = position
+        self.angle = angle
+        self.c = np.cos(angle)
+        self.s = np.sin(angle)
+
+    def __mul__(self, v):
+        return vec2(self.c * v[0] - self.s * v[1] + self.position[0],
+                    self.s * v[0] + self.c * v[1] + self.position[1])
+
+
+class DiscBody:
+    """
+        handle of a body in a DiscWorld, all state lives in the arrays of
+        the world (row slot)
+    """
+    def __init__(self, world, slot):
+        self.world = world
+        self.slot = slot
+        self.fixtures = []
+        self.userData = None
+
+    @property
+    def position(self):
+        return vec2(*self.world.positions[self.slot])
+
+    @position.setter
+    def position(self, p):
+        self.world.positions[self.slot] = (p[0], p[1])
+
+    @property
+    def angle(self):
+        return float(self.world.angles[self.slot])
+
+    @angle.setter
+    def angle(self, a):
+        self.world.angles[self.slot] = a
+
+    @property
+    def linearVelocity(self):
+        return vec2(*self.world.velocities[self.slot])
+
+    @linearVelocity.setter
+    def linearVelocity(self, v):
+        self.world.velocities[self.slot] = (v[0], v[1])
+        self.world.awake[self.slot] = True
+
+    @property
+    def angularVelocity(self):
+        return float(self.world.angularVelocities[self.slot])
+
+    @angularVelocity.setter
+    def angularVelocity(self, w):
+        self.world.angularVelocities[self.slot] = w
+        self.world.awake[self.slot] = True
+
+    @property
+    def linearDamping(self):
+        return float(self.world.linearDampings[self.slot])
+
+    @linearDamping.setter
+    def linearDamping(self, c):
+        self.world.linearDampings[self.slot] = c
+
+    @property
+    def angularDamping(self):
+        return float(self.world.angularDampings[self.slot])
+
+    @angularDamping.setter
+    def angularDamping(self, c):
+        self.world.angularDampings[self.slot] = c
+
+    # there is no sleeping, a body which is put to sleep only stops
+    @property
+    def awake(self):
+        return bool(self.world.awake[self.slot])
+
+    @awake.setter
+    def awake(self, awake):
+        self.world.awake[self.slot] = awake
+        if not awake:
+            self.world.velocities[self.slot] = 0
+            self.world.angularVelocities[self.slot] = 0
+
+    # inactive bodies are neither moved nor collided
+    @property
+    def active(self):
+        return bool(self.world.active[self.slot])
+
+    @active.setter
+    def active(self, active):
+        self.world.active[self.slot] = active
+
+    @property
+    def mass(self):
+        invMass = self.world.invMasses[self.slot]
+        return 1.0 / invMass if invMass > 0 else 0.0
+
+    @property
+    def transform(self):
+        return DiscTransform(self.world.positions[self.slot],
+                             self.world.angles[self.slot])
+
+    def GetWorldPoint(self, localPoint):
+        return self.transform * localPoint
+
+    def GetWorldVector(self, localVector):
+        t = self.transform
+        return vec2(t.c * localVector[0] - t.s * localVector[1],
+                    t.s * localVector[0] + t.c * localVector[1])
+
+    def CreateCircleFixture(self, radius, density=1.0, friction=0.2,
+            restitution=0.0):
+        return self._createFixture(circleShape(radius=radius), density,
+                friction, restitution)
+
+    def CreatePolygonFixture(self, box, density=1.0, friction=0.2,
+            restitution=0.0):
+        return self._createFixture(
+                polygonShape(box=(float(box[0]), float(box[1]))), density,
+                friction, restitution)
+
+    def _createFixture(self, shape, density, friction, restitution):
+        if self.fixtures:
+            raise ValueError('a DiscBody can only have one fixture')
+
+        fixture = DiscFixture(self, shape, density, friction, restitution)
+        self.fixtures.append(fixture)
+        self.world._setShape(self.slot, shape, density)
+
+        return fixture
+
+
+class DiscWorld:
+    DISC, BOX = 1, 2
+
+    # corners of a box in units of its half extents
+    CORNERS = np.array([[-1.0, -1.0], [1.0, -1.0], [1.0, 1.0], [-1.0, 1.0]])
+
+    """
+        gravity and doSleep are only accepted for compatibility with the
+        Box2D world, there is neither gravity nor sleeping
+
+        skinFactor: bodies closer than skinFactor * smallest disc radius
+            are kept as contact candidates between steps
+        maxIterations: at most this many position iterations per step
+            (positionIterations is capped), with small steps few
+            iterations are enough for position based contacts
+    """
+    def __init__(self, gravity=(0, 0), doSleep=True, skinFactor=2.0,
+            maxIterations=2):
+        self.allowSleeping = doSleep
+        self.skinFactor = skinFactor
+        self.maxIterations = maxIterations
+
+        self.capacity = 0
+        self.slots = []  # DiscBody or None
+        self.freeSlots = []
+        self._grow(64)
+
+        # contact candidates, see _updateCandidates
+        self.candidateBodies = None
+        self.skin = 0.0
+
+    def _grow(self, capacity):
+        def resize(a, shape, dtype):
+            b = np.zeros(shape, dtype=dtype)
+            if a is not None:
+                b[:a.shape[0]] = a
+            return b
+
+        def get(name):
+            return getattr(self, name, None)
+
+        n = capacity
+        self.positions = resize(get('positions'), (n, 2), float)
+        self.angles = resize(get('angles'), n, float)
+        self.velocities = resize(get('velocities'), (n, 2), float)
+        self.angularVelocities = resize(get('angularVelocities'), n, float)
+        self.linearDampings = resize(get('linearDampings'), n, float)
+        self.angularDampings = resize(get('angularDampings'), n, float)
+        self.invMasses = resize(get('invMasses'), n, float)
+        self.invInertias = resize(get('invInertias'), n, float)
+        self.radii = resize(get('radii'), n, float)
+        self.halfExtents = resize(get('halfExtents'), (n, 2), float)
+        self.extents = resize(get('extents'), n, float)  # bounding radius
+        self.kinds = resize(get('kinds'), n, np.int8)
+        self.dynamic = resize(get('dynamic'), n, bool)
+        self.used = resize(get('used'), n, bool)
+        self.active = resize(get('active'), n, bool)
+        self.awake = resize(get('awake'), n, bool)
+
+        self.freeSlots += range(n - 1, self.capacity - 1, -1)
+        self.slots += [None] * (n - self.capacity)
+        self.capacity = n
+
+    @property
+    def bodies(self):
+        return [b for b in self.slots if b is not None]
+
+    @property
+    def bodyCount(self):
+        return int(self.used.sum())
+
+    def _createBody(self, dynamic, position, angle, linearDamping,
+            angularDamping):
+        if not self.freeSlots:
+            self._grow(2 * self.capacity)
+
+        slot = self.freeSlots.pop()
+        body = DiscBody(self, slot)
+        self.slots[slot] = body
+
+        self.positions[slot] = (position[0], position[1])
+        self.angles[slot] = angle
+        self.velocities[slot] = 0
+        self.angularVelocities[slot] = 0
+        self.linearDampings[slot] = linearDamping
+        self.angularDampings[slot] = angularDamping
+        self.invMasses[slot] = 0
+        self.invInertias[slot] = 0
+        self.radii[slot] = 0
+        self.halfExtents[slot] = 0
+        self.extents[slot] = 0
+        self.kinds[slot] = 0
+        self.dynamic[slot] = dynamic
+        self.used[slot] = True
+        self.active[slot] = True
+        self.awake[slot] = True
+
+        return body
+
+    def CreateDynamicBody(self, position=(0, 0), angle=0.0,
+            linearDamping=0.0, angularDamping=0.0):
+        return self._createBody(True, position, angle, linearDamping,
+                angularDamping)
+
+    """
+        shapes: circleShape or (axis aligned) polygonShape box, or a list
+            with one of them
+    """
+    def CreateStaticBody(self, position=(0, 0), angle=0.0, shapes=None):
+        body = self._createBody(False, position, angle, 0.0, 0.0)
+
+        if isinstance(shapes, (list, tuple)):
+            if len(shapes) != 1:
+                raise ValueError('a DiscBody can only have one shape')
+            shapes = shapes[0]
+
+        if shapes is not None:
+            body._createFixture(shapes, 0.0, 0.2, 0.0)
+
+        return body
+
+    def DestroyBody(self, body):
+        slot = body.slot
+        self.slots[slot] = None
+        self.used[slot] = False
+        self.freeSlots.append(slot)
+
+    def _setShape(self, slot, shape, density):
+        if isinstance(shape, circleShape):
+            r = shape.radius
+            self.kinds[slot] = self.DISC
+            self.radii[slot] = r
+            self.extents[slot] = r
+
+            mass = density * np.pi * r ** 2
+            inertia = 0.5 * mass * r ** 2
+        else:
+            # box centred on the body
+            vertices = np.array(shape.vertices)
+            hw, hh = vertices.max(axis=0)
+            self.kinds[slot] = self.BOX
+            self.halfExtents[slot] = (hw, hh)
+            self.extents[slot] = np.sqrt(hw ** 2 + hh ** 2)
+
+            mass = density * 4.0 * hw * hh
+            inertia = mass * (hw ** 2 + hh ** 2) / 3.0
+
+        if self.dynamic[slot]:
+            if mass <= 0:
+                mass, inertia = 1.0, 1.0
+            self.invMasses[slot] = 1.0 / mass
+            self.invInertias[slot] = 1.0 / inertia
+
+    def Step(self, timeStep, velocityIterations, positionIterations):
+        simulated = self.used & self.active & (self.kinds > 0)
+        moving = np.flatnonzero(simulated & self.dynamic)
+
+        # velocities (only damping, there are no forces)
+        self.velocities[moving] *= \
+                (1.0 / (1.0 + timeStep * self.linearDampings[moving]))[:, None]
+        self.angularVelocities[moving] *= \
+                1.0 / (1.0 + timeStep * self.angularDampings[moving])
+
+        oldPositions = self.positions[moving].copy()
+        oldAngles = self.angles[moving].copy()
+
+        self.positions[moving] += timeStep * self.velocities[moving]
+        self.angles[moving] += timeStep * self.angularVelocities[moving]
+
+        self._updateCandidates(np.flatnonzero(simulated))
+
+        for i in range(min(positionIterations, self.maxIterations)):
+            self._solvePositions()
+
+        self.velocities[moving] = \
+                (self.positions[moving] - oldPositions) / timeStep
+        self.angularVelocities[moving] = \
+                (self.angles[moving] - oldAngles) / timeStep
+
+    """
+        finds the pairs of bodies which can touch, they are kept until
+        bodies are added or removed or a body moved more than half the skin
+        (corners of rotating boxes included)
+
+            disc - disc pairs from a SpatialHash
+            disc - box and box corner - box pairs closer than the skin
+    """
+    def _updateCandidates(self, bodies):
+        if self.candidateBodies is not None and \
+                np.array_equal(bodies, self.candidateBodies):
+            moved = np.sqrt(((self.positions[bodies] -
+                              self.candidatePositions) ** 2).sum(axis=1)) + \
+                    np.abs(self.angles[bodies] - self.candidateAngles) * \
+                    self.extents[bodies]
+            if len(bodies) == 0 or moved.max() <= 0.5 * self.skin:
+                return
+
+        self.candidateBodies = bodies.copy()
+        self.candidatePositions = self.positions[bodies].copy()
+        self.candidateAngles = self.angles[bodies].copy()
+
+        discs = bodies[self.kinds[bodies] == self.DISC]
+        boxes = bodies[self.kinds[bodies] == self.BOX]
+
+        if len(discs) > 0:
+            self.skin = self.skinFactor * self.radii[discs].min()
+        elif len(boxes) > 0:
+            self.skin = self.skinFactor * self.halfExtents[boxes].min()
+
+        self.pairs = self._discPairs(discs)
+
+        # discs and box corners (radius 0) against boxes
+        D, B = self._pointBoxPairs(self.positions[discs], self.radii[discs],
+                discs, boxes)
+        D = discs[D]
+
+        owners = np.repeat(boxes, 4)
+        corners = np.tile(np.arange(4), len(boxes))
+        P, Q = self._pointBoxPairs(self._corners(owners, corners),
+                np.zeros(len(owners)), owners, boxes)
+
+        self.pointOwners = np.concatenate([D, owners[P]])
+        self.pointBoxes = np.concatenate([B, Q])
+        self.pointRadii = np.concatenate([self.radii[D], np.zeros(len(P))])
+        self.pointCorners = corners[P]
+        self.cornerRows = np.arange(len(D), len(D) + len(P))
+
+    def _discPairs(self, discs):
+        if len(discs) < 2:
+            return (np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+
+        # small discs are paired with a grid, large ones with every disc
+        radii = self.radii[discs]
+        small = radii <= 2.0 * radii.min()
+        smallDiscs = discs[small]
+        I = [np.zeros(0, dtype=int)]
+        J = [np.zeros(0, dtype=int)]
+
+        if len(smallDiscs) > 1:
+            cellSize = 2.0 * self.radii[smallDiscs].max() + self.skin
+            grid = SpatialHash(cellSize)
+            grid.build(self.positions[smallDiscs])
+            i, j, dist = grid.queryPairs(cellSize)
+
+            keep = (i < j) & (dist <= self.radii[smallDiscs[i]] +
+                              self.radii[smallDiscs[j]] + self.skin)
+            I.append(smallDiscs[i[keep]])
+            J.append(smallDiscs[j[keep]])
+
+        for big in discs[~small]:
+            others = discs[(discs != big) & (small | (discs > big))]
+            I.append(np.full(len(others), big))
+            J.append(others)
+
+        return (np.concatenate(I), np.concatenate(J))
+
+    """
+        points with radius of the bodies owners against boxes
+
+        returns (point index, box) of the pairs closer than the skin,
+        at least one of the bodies has to be dynamic
+    """
+    def _pointBoxPairs(self, points, radii, owners, boxes):
+        if len(points) == 0 or len(boxes) == 0:
+            return (np.zeros(0, dtype=int), np.zeros(0, dtype=int))
+
+        # dimensions: point, box
+        d = points[:, None, :] - self.positions[boxes][None, :, :]
+        c = np.cos(self.angles[boxes])[None, :]
+        s = np.sin(self.angles[boxes])[None, :]
+        h = self.halfExtents[boxes]
+
+        lx = c * d[:, :, 0] + s * d[:, :, 1]
+        ly = -s * d[:, :, 0] + c * d[:, :, 1]
+        ex = np.abs(lx) - h[None, :, 0]
+        ey = np.abs(ly) - h[None, :, 1]
+        dist = np.sqrt(np.maximum(ex, 0) ** 2 + np.maximum(ey, 0) ** 2)
+
+        near = (dist <= radii[:, None] + self.skin) & \
+                (owners[:, None] != boxes[None, :]) & \
+                (self.dynamic[owners][:, None] | self.dynamic[boxes][None, :])
+        P, B = np.nonzero(near)
+
+        return (P, boxes[B])
+
+    def _corners(self, boxes, corners):
+        local = self.CORNERS[corners] * self.halfExtents[boxes]
+        c = np.cos(self.angles[boxes])
+        s = np.sin(self.angles[boxes])
+
+        return self.positions[boxes] + np.stack(
+                [c * local[:, 0] - s * local[:, 1],
+                 s * local[:, 0] + c * local[:, 1]], axis=1)
+
+    """
+        one round of position projection over all contacts
+    """
+    def _solvePositions(self):
+        contacts = [self._discContacts()]
+
+        if len(self.pointOwners) > 0:
+            points = self.positions[self.pointOwners]
+            points[self.cornerRows] = self._corners(
+                    self.pointOwners[self.cornerRows], self.pointCorners)
+
+            contacts.append(self._pointContacts(points, self.pointRadii,
+                    self.pointOwners, self.pointBoxes))
+
+        A = np.concatenate([k[0] for k in contacts])
+        if len(A) == 0:
+            return
+
+        self._project(A, *[np.concatenate([k[i] for k in contacts])
+                           for i in range(1, 5)])
+
+    """
+        returns contacts (A, B, normal from A to B, point, depth)
+    """
+    def _discContacts(self):
+        I, J = self.pairs
+        d = self.positions[J] - self.positions[I]
+        dist = np.sqrt((d ** 2).sum(axis=1))
+        depths = self.radii[I] + self.radii[J] - dist
+
+        touching = depths > 0
+        I, J, d, dist, depths = (I[touching], J[touching], d[touching],
+                                 dist[touching], depths[touching])
+
+        normals = np.zeros_like(d)
+        normals[:, 0] = 1.0
+        apart = dist > 0
+        normals[apart] = d[apart] / dist[apart][:, None]
+
+        points = self.positions[I] + normals * self.radii[I][:, None]
+
+        return I, J, normals, points, depths
+
+    """
+        points with radius (discs or box corners with radius 0) of the
+        bodies owners against boxes, one box per point
+
+        returns contacts from box (A) to owner (B)
+    """
+    def _pointContacts(self, points, radii, owners, boxes):
+        d = points - self.positions[boxes]
+        c = np.cos(self.angles[boxes])
+        s = np.sin(self.angles[boxes])
+        hx = self.halfExtents[boxes, 0]
+        hy = self.halfExtents[boxes, 1]
+
+        # point in the coordinates of the box
+        lx = c * d[:, 0] + s * d[:, 1]
+        ly = -s * d[:, 0] + c * d[:, 1]
+        ex = lx - np.clip(lx, -hx, hx)
+        ey = ly - np.clip(ly, -hy, hy)
+        dist = np.sqrt(ex ** 2 + ey ** 2)
+
+        # outside: away from the closest point on the box,
+        # inside: out over the closest side
+        inside = dist == 0
+        gapX = hx - np.abs(lx)
+        gapY = hy - np.abs(ly)
+        overX = inside & (gapX < gapY)
+        overY = inside & ~overX
+
+        safeDist = np.where(inside, 1.0, dist)
+        nx = np.where(overX, np.sign(lx) + (lx == 0), ex / safeDist)
+        ny = np.where(overY, np.sign(ly) + (ly == 0), ey / safeDist)
+        depths = np.where(inside, radii + np.minimum(gapX, gapY),
+                          radii - dist)
+
+        touching = depths > 0
+        nx, ny, c, s = nx[touching], ny[touching], c[touching], s[touching]
+        depths = depths[touching]
+
+        normals = np.stack([c * nx - s * ny, s * nx + c * ny], axis=1)
+
+        # contact point on the surface of the box
+        contactPoints = points[touching] - normals * \
+                (radii[touching] - depths)[:, None]
+
+        return (boxes[touching], owners[touching], normals, contactPoints,
+                depths)
+
+    """
+        moves A and B apart along the normals by depth, split by their
+        inverse mass and inertia, contributions to a body are averaged
+    """
+    def _project(self, A, B, normals, points, depths):
+        rA = points - self.positions[A]
+        rB = points - self.positions[B]
+        rnA = rA[:, 0] * normals[:, 1] - rA[:, 1] * normals[:, 0]
+        rnB = rB[:, 0] * normals[:, 1] - rB[:, 1] * normals[:, 0]
+
+        wA = self.invMasses[A] + self.invInertias[A] * rnA ** 2
+        wB = self.invMasses[B] + self.invInertias[B] * rnB ** 2
+        w = wA + wB
+        solvable = w > 0
+        lam = np.where(solvable, depths / np.where(solvable, w, 1.0), 0.0)
+
+        n = self.capacity
+        idx = np.concatenate([A, B])
+        mA = -self.invMasses[A] * lam
+        mB = self.invMasses[B] * lam
+
+        dx = np.bincount(idx, np.concatenate([mA * normals[:, 0],
+                                              mB * normals[:, 0]]), n)
+        dy = np.bincount(idx, np.concatenate([mA * normals[:, 1],
+                                              mB * normals[:, 1]]), n)
+        dAngle = np.bincount(idx, np.concatenate(
+                [-self.invInertias[A] * rnA * lam,
+                 self.invInertias[B] * rnB * lam]), n)
+        counts = np.bincount(idx, minlength=n)
+
+        touched = np.flatnonzero(counts)
+        self.positions[touched, 0] += dx[touched] / counts[touched]
+        self.positions[touched, 1] += dy[touched] / counts[touched]
+        self.angles[touched] += dAngle[touched] / counts[touched]
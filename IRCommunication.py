@@ -0,0 +1,41 @@
+from Kilobot import Kilobot
+from SpatialHash import SpatialHash
+
+
+class IRCommunication:
+    """
+        Delivers the messages broadcast by kilobots (Kilobot.broadcast) to
+        all kilobots within communication range (Kilobot.getMessages).
+        Neighbours are found with a spatial hash which is rebuilt once per
+        step from the swarm positions, instead of pairwise distance checks.
+
+        swarm: Swarm of the kilobots, has to be updated before step()
+        communication_range: in meters
+    """
+    def __init__(self, swarm, communication_range=Kilobot.COMMUNICATION_RANGE):
+        self.swarm = swarm
+        self.communication_range = communication_range
+
+        self.grid = SpatialHash(communication_range)
+
+    """
+        replaces the received messages of all kilobots with the messages
+        sent in this step
+    """
+    def step(self):
+        kilobots = self.swarm.kilobots
+
+        senders = [i for (i, kilobot) in enumerate(kilobots)
+                   if kilobot.message_out is not None]
+
+        for kilobot in kilobots:
+            kilobot.messages_in = []
+
+        if len(senders) == 0:
+            return
+
+        self.grid.build(self.swarm.positions)
+        I, J, dist = self.grid.queryPairs(self.communication_range, senders)
+
+        for (i, j, d) in zip(I.tolist(), J.tolist(), dist.tolist()):
+            kilobots[j].messages_in.append((kilobots[i].message_out, d))
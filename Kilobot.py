@@ -19,6 +19,11 @@ class Kilobot:
     LINEAR_DAMPING = 0.8
     ANGULAR_DAMPING = 0.8
 
+    COMMUNICATION_RANGE = 0.1  # meters (IR)
+
+    CIRCLE_COLOR = (127, 127, 127, 255)
+    LINE_COLOR = (255, 0, 0, 255)
+
     """
         scale_real_to_sim: scale factor to go from real world to
             simulation coords (for numerical reasons)
@@ -26,6 +31,7 @@ class Kilobot:
             visualisation coords (meter to pixels)
     """
     def __init__(self, world, scale_real_to_sim, scale_real_to_vis, pos):
+        self.world = world
         self.scale_real_to_sim = scale_real_to_sim
         self.scale_sim_to_vis = (1.0 / scale_real_to_sim) * scale_real_to_vis
 
@@ -48,8 +54,20 @@ class Kilobot:
         self.value_motor_left = 0
         self.value_motor_right = 0
 
-        self.circle_color = (127, 127, 127, 255)
-        self.line_color = (255, 0, 0, 255)
+        # IR messages, delivered by IRCommunication
+        self.message_out = None
+        self.messages_in = []
+
+        self.circle_color = self.CIRCLE_COLOR
+        self.line_color = self.LINE_COLOR
+
+    """
+        removes the body from the world, the kilobot can't be used afterwards
+    """
+    def destroy(self):
+        self.world.DestroyBody(self.body)
+        self.body = None
+        self.fixture = None
 
     def step(self):
         raise NotImplementedError('Kilobot subclass needs to implement step')
@@ -70,24 +88,53 @@ class Kilobot:
         self.value_motor_left = left
         self.value_motor_right = right
 
+    """
+        numbers which describe the state of the controller (for Snapshot),
+        subclasses with state have to extend both methods
+    """
+    def getControllerState(self):
+        return [self.value_motor_left, self.value_motor_right]
+
+    def setControllerState(self, state):
+        self.value_motor_left = int(state[0])
+        self.value_motor_right = int(state[1])
+
+    """
+        message: sent to all kilobots in communication range on every step
+            until it is changed, None stops sending
+    """
+    def broadcast(self, message):
+        self.message_out = message
+
+    """
+        returns the (message, distance) pairs received in the last step,
+        distance in meters
+    """
+    def getMessages(self):
+        return self.messages_in
+
     def getRealPosition(self):
         pos = self.body.position
         return array([pos[0], pos[1]]).reshape(1, 2) / self.scale_real_to_sim
 
+    """
+        draws this kilobot, use SwarmRenderer to draw many kilobots
+    """
     def draw(self, screen):
-        h = screen.get_height()
+        w, h = screen.get_size()
         s = self.scale_sim_to_vis
+        r = self.pixel_radius
 
         center = self.body.position
         top = self.body.GetWorldPoint((0.0, self.sim_radius))
 
-        if center.x < 0 or center.y < 0:
-            print(center)
-            return
-
         cx = int(round(s * center.x))
         cy = int(round(h - s * center.y))
 
+        # partly visible kilobots are clipped by pygame
+        if cx + r < 0 or cx - r >= w or cy + r < 0 or cy - r >= h:
+            return
+
         top_x = int(round(s * top.x))
         top_y = int(round(h - s * top.y))
 
@@ -1,5 +1,9 @@
 from Box2D.b2 import*
 from pygame import gfxdraw
+from pygame.locals import RLEACCEL
+import pygame
+
+from numpy import array, asarray, clip, sqrt
 
 
 class Labyrinth:
@@ -15,6 +19,10 @@ class Labyrinth:
         self.scale_sim_to_vis = (1.0 / scale_real_to_sim) * scale_real_to_vis
 
         self.walls = []
+        self.wall_boxes = []  # xmin, ymin, xmax, ymax in real world coords
+
+        # the walls don't move, they are drawn once into this surface
+        self.background = None
 
         # uses meters in the real world | origin is at bottom, left
         # labyrinth is 2m x 1m
@@ -28,7 +36,12 @@ class Labyrinth:
         self.add_wall(1.00, 0.75, 0.01, 0.25)  # near start (1)
         self.add_wall(1.245, 0.50, 0.255, 0.01)  # near start (2)
 
+        # the object has to be pushed into this region behind the wall near
+        # the goal, xmin, ymin, xmax, ymax in real world coords
+        self.goal_box = (0.02, 0.02, 0.49, 0.25)
+
         self.wall_color = (127, 127, 127, 255)
+        self.goal_color = (0, 95, 0, 255)
 
     def __del__(self):
         for wall in self.walls:
@@ -44,8 +57,61 @@ class Labyrinth:
                     box = self.scale_real_to_sim * vec2(half_w, half_h)))
 
         self.walls.append(wall)
+        self.wall_boxes.append((cx - half_w, cy - half_h,
+                                cx + half_w, cy + half_h))
+
+        # has to be drawn again
+        self.background = None
+
+    """
+        returns a (number of walls) x 4 array: xmin, ymin, xmax, ymax
+        in real world coordinates
+    """
+    def getWallBoxes(self):
+        return array(self.wall_boxes).reshape(-1, 4)
+
+    """
+        points: n x 2 in real world coords
+
+        returns a bool array, True for the points in the goal region
+    """
+    def isInGoal(self, points):
+        points = asarray(points).reshape(-1, 2)
+        xmin, ymin, xmax, ymax = self.goal_box
+
+        return (points[:, 0] >= xmin) & (points[:, 0] <= xmax) & \
+               (points[:, 1] >= ymin) & (points[:, 1] <= ymax)
+
+    """
+        points: n x 2 in real world coords
+
+        returns the distance of every point to the closest wall (0 inside
+        a wall)
+    """
+    def getWallDistances(self, points):
+        points = asarray(points).reshape(-1, 1, 2)
+        boxes = self.getWallBoxes()
+
+        closest = clip(points, boxes[:, 0:2], boxes[:, 2:4])
+        distances = sqrt(((points - closest) ** 2).sum(axis=2))
+
+        return distances.min(axis=1)
 
     def draw(self, screen):
+        if self.background is None or \
+                self.background.get_size() != screen.get_size():
+            self.background = self._drawBackground(screen)
+
+        screen.blit(self.background, (0, 0))
+
+    """
+        returns a surface with all walls, black is transparent
+    """
+    def _drawBackground(self, screen):
+        background = pygame.Surface(screen.get_size(), 0, screen)
+        background.fill((0, 0, 0))
+        background.set_colorkey((0, 0, 0), RLEACCEL)
+
         h = screen.get_height()
         s = self.scale_sim_to_vis
 
@@ -55,4 +121,12 @@ class Labyrinth:
             verts = wall.fixtures[0].shape.vertices
             verts = [(s * (pos.x + x), h - s * (pos.y + y)) for (x, y) in verts]
 
-            gfxdraw.filled_polygon(screen, verts, self.wall_color)
+            gfxdraw.filled_polygon(background, verts, self.wall_color)
+
+        xmin, ymin, xmax, ymax = self.goal_box
+        s = self.scale_sim_to_vis * self.scale_real_to_sim
+        gfxdraw.rectangle(background, (int(s * xmin), int(h - s * ymax),
+                int(s * (xmax - xmin)), int(s * (ymax - ymin))),
+                self.goal_color)
+
+        return background
@@ -0,0 +1,107 @@
+from numpy import *
+
+from Kilobot import Kilobot
+from OcclusionGrid import OcclusionGrid
+
+
+class LightField:
+    FALLOFFS = ('linear', 'inverse_square')
+
+    # distance at which an 'inverse_square' light has half its intensity
+    HALF_INTENSITY_DISTANCE = 0.25  # meters
+
+    """
+        Ambient light sensor readings of a whole swarm.
+        update() computes the reading of every kilobot from all lights at
+        once, a kilobot reads its value from readings[kilobot.swarm_index].
+
+        The sensor sits on the front of the kilobot. A light contributes
+            'linear': intensity * (1 - d) (the old single light model,
+                negative for lights further away than 1m)
+            'inverse_square': intensity / (1 + (d / HALF_INTENSITY_DISTANCE)^2)
+        where d is the distance in meters, the contributions are summed.
+
+        swarm: Swarm of the kilobots, has to be updated before update()
+        falloff: one of FALLOFFS
+        noise: standard deviation of gaussian noise added to every reading
+        labyrinth: lights are occluded by the walls of this Labyrinth if
+            not None, looked up in an OcclusionGrid
+        rng: numpy RandomState for the noise
+        occlusionOptions: passed on to OcclusionGrid (resolution,
+            lightResolution, cacheSize)
+    """
+    def __init__(self, swarm, falloff='linear', noise=0.0, labyrinth=None,
+            rng=None, **occlusionOptions):
+        if falloff not in self.FALLOFFS:
+            raise ValueError('unknown falloff \'{}\', use one of {}'
+                    .format(falloff, list(self.FALLOFFS)))
+
+        self.swarm = swarm
+        self.falloff = falloff
+        self.noise = noise
+        self.occlusion = OcclusionGrid(labyrinth, **occlusionOptions) \
+                if labyrinth is not None else None
+        self.rng = rng if rng is not None else random.RandomState()
+
+        self.lights = zeros((0, 2))
+        self.intensities = zeros(0)
+
+        # one entry per kilobot, distances to the closest light
+        self.readings = zeros(0)
+        self.distances = zeros(0)
+
+    """
+        returns the index of the light
+    """
+    def addLight(self, pos, intensity=1.0):
+        self.lights = vstack([self.lights, reshape(pos, (1, 2))])
+        self.intensities = append(self.intensities, intensity)
+
+        return len(self.intensities) - 1
+
+    def setLightPosition(self, i, pos):
+        self.lights[i] = reshape(pos, 2)
+
+    """
+        n x 2 positions of the light sensors in real world coords
+    """
+    def getSensorPositions(self):
+        angles = self.swarm.angles
+        offsets = Kilobot.RADIUS * column_stack([-sin(angles), cos(angles)])
+
+        return self.swarm.positions + offsets
+
+    """
+        n x numLights boolean array, True where a wall is between sensor
+        and light
+    """
+    def _occluded(self, sensors):
+        visible = [self.occlusion.isVisible(sensors, light)
+                   for light in self.lights]
+
+        return ~array(visible, dtype=bool).reshape(-1, sensors.shape[0]).T
+
+    def update(self):
+        sensors = self.getSensorPositions()
+
+        d = sqrt(((sensors[:, newaxis, :] - self.lights[newaxis, :, :]) ** 2)
+                 .sum(axis=2))
+
+        if self.falloff == 'linear':
+            contributions = self.intensities * (1.0 - d)
+        else:
+            contributions = self.intensities / \
+                    (1.0 + (d / self.HALF_INTENSITY_DISTANCE) ** 2)
+
+        if self.occlusion is not None:
+            contributions[self._occluded(sensors)] = 0.0
+
+        self.readings = contributions.sum(axis=1)
+        if self.noise > 0:
+            self.readings += self.rng.normal(0.0, self.noise,
+                                             self.readings.shape)
+
+        if d.shape[1] > 0:
+            self.distances = d.min(axis=1)
+        else:
+            self.distances = full(sensors.shape[0], inf)
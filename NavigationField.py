@@ -0,0 +1,262 @@
+import hashlib
+import os
+
+from numpy import *
+
+from Object import Object
+
+
+# 8 neighbours of a cell and the distance to them in cells
+NEIGHBOURS = [(-1, -1), (-1, 0), (-1, 1), (0, -1), (0, 1), (1, -1), (1, 0),
+              (1, 1)]
+STEP_LENGTHS = [sqrt(dx ** 2 + dy ** 2) for (dx, dy) in NEIGHBOURS]
+
+
+"""
+    returns the (target, source) slices of an axis of n cells shifted by d
+"""
+def _shiftSlices(d, n):
+    if d >= 0:
+        return slice(0, n - d), slice(d, n)
+    return slice(-d, n), slice(0, n + d)
+
+
+"""
+    values: grid, shifted so that result[x, y] = values[x + dx, y + dy],
+    cells shifted in from outside are fill
+"""
+def _shift(values, dx, dy, fill):
+    result = full(values.shape, fill, dtype=values.dtype)
+
+    (tx, sx) = _shiftSlices(dx, values.shape[0])
+    (ty, sy) = _shiftSlices(dy, values.shape[1])
+    result[tx, ty] = values[sx, sy]
+
+    return result
+
+
+"""
+    distances: grid with the fixed distances (inf where unknown)
+    passable: grid of booleans, the distances are only spread over these
+
+    returns the geodesic distances (in cells, 8 neighbours), relaxed until
+    nothing changes
+"""
+def _wavefront(distances, passable):
+    distances = distances.copy()
+
+    while True:
+        relaxed = distances
+        for ((dx, dy), length) in zip(NEIGHBOURS, STEP_LENGTHS):
+            relaxed = minimum(relaxed, _shift(distances, dx, dy, inf) + length)
+        relaxed = where(passable, relaxed, distances)
+
+        if array_equal(relaxed, distances):
+            return distances
+        distances = relaxed
+
+
+"""
+    distances: grid, set in the free cells
+    free: grid of booleans
+
+    returns the distances with every other cell set to the distance of its
+    closest free cell plus the way to it
+"""
+def _spreadOut(distances, free):
+    distances = where(free, distances, inf)
+    travelled = where(free, 0.0, inf)
+
+    while True:
+        changed = False
+        for ((dx, dy), length) in zip(NEIGHBOURS, STEP_LENGTHS):
+            t = _shift(travelled, dx, dy, inf) + length
+            closer = (t < travelled) & ~free
+            if closer.any():
+                travelled = where(closer, t, travelled)
+                distances = where(closer,
+                        _shift(distances, dx, dy, inf) + length, distances)
+                changed = True
+
+        if not changed:
+            return distances
+
+
+class NavigationField:
+    """
+        Geodesic distance to the goal region of a Labyrinth for every
+        position, the walls inflated by the size of the object.
+        The labyrinth is divided into cells of resolution x resolution
+        meters. The distances are spread from the goal cells over the free
+        cells (wavefront), every cell points to its neighbour closest to
+        the goal. Cells the object can't be in get the distance to the goal
+        from their closest free cell, so positions at a wall lead away from
+        it.
+
+        Computing the field takes about 0.1s at 1cm cells, it is saved in
+        cacheDir under a hash of the walls, the goal and the parameters and
+        loaded from there if it was computed before. Lookups are a single
+        cell access per position.
+
+        It can be used as maze policy (getTargetPosition) and for reward
+        shaping (getDistance).
+
+        labyrinth: Labyrinth, the field is recomputed when walls are added
+        resolution: edge length of a cell in meters
+        inflation: minimum distance of a free cell centre to the walls
+            in meters, half the width of the object by default
+        lookahead: distance of the target position from the object in
+            meters (getTargetPosition)
+        cacheDir: directory the fields are saved in, no saving if None,
+            if saving fails the field is only kept in memory
+    """
+    CACHE_DIR = os.path.join(os.path.expanduser('~'), '.cache', 'kbsim')
+
+    # part of the cache key, increase when the computation changes
+    VERSION = 1
+
+    def __init__(self, labyrinth, resolution=0.01, inflation=Object.HALF_W,
+            lookahead=0.1, cacheDir=CACHE_DIR):
+        self.labyrinth = labyrinth
+        self.resolution = resolution
+        self.inflation = inflation
+        self.lookahead = lookahead
+        self.cacheDir = cacheDir
+
+        self.numWalls = None
+
+        self._updateWalls()
+
+    def _updateWalls(self):
+        boxes = self.labyrinth.getWallBoxes()
+        if boxes.shape[0] == self.numWalls:
+            return
+
+        self.numWalls = boxes.shape[0]
+
+        key = self._getKey(boxes)
+        path = None if self.cacheDir is None else \
+                os.path.join(self.cacheDir, 'navigation_{}.npz'.format(key))
+
+        if path is not None and os.path.exists(path):
+            field = load(path)
+            self.origin = field['origin']
+            self.distances = field['distances']
+            self.directions = field['directions']
+        else:
+            self._compute(boxes)
+            if path is not None:
+                try:
+                    self._save(path)
+                except (IOError, OSError) as e:
+                    print('navigation field not cached: {}'.format(e))
+
+        self.shape = array(self.distances.shape)
+
+    """
+        returns a hash of everything the field depends on
+    """
+    def _getKey(self, boxes):
+        h = hashlib.sha1()
+        h.update(ascontiguousarray(boxes, dtype=float64).tobytes())
+        h.update(array(self.labyrinth.goal_box, dtype=float64).tobytes())
+        h.update(array([self.resolution, self.inflation, self.VERSION],
+                       dtype=float64).tobytes())
+
+        return h.hexdigest()
+
+    def _compute(self, boxes):
+        # the grid covers the bounding box of the walls
+        if boxes.shape[0] > 0:
+            self.origin = boxes[:, 0:2].min(axis=0)
+            size = boxes[:, 2:4].max(axis=0) - self.origin
+        else:
+            self.origin = zeros(2)
+            size = zeros(2)
+
+        shape = maximum(ceil(size / self.resolution), 1).astype(int)
+
+        cx = self.origin[0] + (arange(shape[0]) + 0.5) * self.resolution
+        cy = self.origin[1] + (arange(shape[1]) + 0.5) * self.resolution
+        X, Y = meshgrid(cx, cy, indexing='ij')
+        centres = column_stack([X.ravel(), Y.ravel()])
+
+        free = (self.labyrinth.getWallDistances(centres) >
+                self.inflation).reshape(shape)
+        goal = self.labyrinth.isInGoal(centres).reshape(shape) & free
+
+        # over the free cells, then from the closest free cell into the
+        # blocked ones
+        distances = where(goal, 0.0, inf)
+        distances = _wavefront(distances, free)
+        distances = _spreadOut(distances, free)
+        self.distances = distances * self.resolution
+
+        # downhill gradient of the distances, toward the neighbour closest
+        # to the goal where the gradient vanishes (ridges, grid border)
+        gx = (_shift(distances, 1, 0, inf) - _shift(distances, -1, 0, inf))
+        gy = (_shift(distances, 0, 1, inf) - _shift(distances, 0, -1, inf))
+        norm = sqrt(gx ** 2 + gy ** 2)
+        smooth = isfinite(norm) & (norm > 0)
+        norm[~smooth] = 1.0
+
+        best = distances.copy()
+        fallback = zeros(tuple(shape) + (2,))
+        for ((dx, dy), length) in zip(NEIGHBOURS, STEP_LENGTHS):
+            neighbour = _shift(distances, dx, dy, inf)
+            closer = neighbour < best
+            best = where(closer, neighbour, best)
+            fallback[closer] = (dx / length, dy / length)
+
+        self.directions = where(smooth[:, :, newaxis],
+                                -dstack([gx, gy]) / norm[:, :, newaxis],
+                                fallback)
+        self.directions[goal] = 0
+
+    def _save(self, path):
+        if not os.path.isdir(self.cacheDir):
+            os.makedirs(self.cacheDir)
+
+        # written under another name first, so a field which is loaded
+        # (maybe by another process) is always complete
+        tmpPath = '{}.{}.tmp.npz'.format(path[:-4], os.getpid())
+        savez(tmpPath, origin=self.origin, distances=self.distances,
+              directions=self.directions)
+        os.rename(tmpPath, path)
+
+    def _getCells(self, points):
+        self._updateWalls()
+
+        points = asarray(points).reshape(-1, 2)
+        cells = floor((points - self.origin) / self.resolution).astype(int)
+
+        return clip(cells, 0, self.shape - 1)
+
+    """
+        points: n x 2 in real world coords
+
+        returns the n distances to the goal region in meters (inf if the
+        goal can't be reached)
+    """
+    def getDistance(self, points):
+        cells = self._getCells(points)
+        return self.distances[cells[:, 0], cells[:, 1]]
+
+    """
+        points: n x 2 in real world coords
+
+        returns n x 2 unit vectors toward the goal (0 in the goal region)
+    """
+    def getDirection(self, points):
+        cells = self._getCells(points)
+        return self.directions[cells[:, 0], cells[:, 1]]
+
+    """
+        objPos: 1 x 2 object position in real world coords
+
+        returns the position lookahead meters toward the goal as 1 x 2
+        matrix (the interface of a maze policy)
+    """
+    def getTargetPosition(self, objPos):
+        return asmatrix(asarray(objPos).reshape(1, 2) +
+                        self.lookahead * self.getDirection(objPos))
@@ -1,7 +1,7 @@
 from Box2D.b2 import*
 from pygame import gfxdraw
 
-from numpy import array
+from numpy import array, cos, linspace, pi, sin
 
 class Object:
     HALF_W = 0.075
@@ -22,6 +22,7 @@ class Object:
     """
     def __init__(self, world, scale_real_to_sim, scale_real_to_vis, pos,
             shape):
+        self.world = world
         self.scale_sim_to_vis = (1.0 / scale_real_to_sim) * scale_real_to_vis
         self.scale_real_to_sim = scale_real_to_sim
 
@@ -49,10 +50,35 @@ class Object:
         self.shape = shape
         self.object_color = (127, 255, 127, 255)
 
+    """
+        removes the body from the world, the object can't be used afterwards
+    """
+    def destroy(self):
+        self.world.DestroyBody(self.body)
+        self.body = None
+        self.fixture = None
+
     def getRealPosition(self):
         pos = self.body.position
         return array([pos[0], pos[1]]).reshape(1, 2) / self.scale_real_to_sim
 
+    """
+        returns n x 2 points on the outline in real world coords, the
+        corners and the middle of the sides of a quad, 16 points of a circle
+    """
+    def getRealOutline(self):
+        if self.shape == 'quad':
+            w, h = self.HALF_W, self.HALF_H
+            local = [(-w, -h), (0, -h), (w, -h), (w, 0),
+                     (w, h), (0, h), (-w, h), (-w, 0)]
+        else:
+            a = linspace(0, 2 * pi, 16, endpoint=False)
+            local = zip(self.HALF_H * cos(a), self.HALF_H * sin(a))
+
+        s = self.scale_real_to_sim
+        return array([self.body.GetWorldPoint((s * x, s * y))
+                      for (x, y) in local]) / s
+
     def draw(self, screen):
         h = screen.get_height()
         s = self.scale_sim_to_vis
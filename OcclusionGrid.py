@@ -0,0 +1,126 @@
+from numpy import *
+
+from collections import OrderedDict
+
+
+"""
+    starts, ends: n x 2, boxes: walls x 4 (xmin, ymin, xmax, ymax)
+
+    returns n booleans, True where the segment from start to end crosses a
+    box (slab test)
+"""
+def segmentsCrossBoxes(starts, ends, boxes):
+    if boxes.shape[0] == 0:
+        return zeros(starts.shape[0], dtype=bool)
+
+    # segments start + t * (end - start), t in [0, 1]
+    # dimensions: segment, wall, axis
+    p = starts[:, newaxis, :]
+    d = ends - starts
+    d = where(d == 0, 1e-12, d)[:, newaxis, :]
+
+    t1 = (boxes[:, 0:2] - p) / d
+    t2 = (boxes[:, 2:4] - p) / d
+
+    tEnter = minimum(t1, t2).max(axis=2)
+    tExit = maximum(t1, t2).min(axis=2)
+
+    hits = (tEnter <= tExit) & (tExit >= 0) & (tEnter <= 1)
+
+    return hits.any(axis=1)
+
+
+class OcclusionGrid:
+    """
+        Precomputed shadows of the Labyrinth walls.
+        The labyrinth is divided into cells of resolution x resolution
+        meters, for a light position the grid tells for every cell if the
+        light can be seen from its centre. Light positions are rounded to
+        lightResolution, the grids of the last cacheSize rounded positions
+        are kept (least recently used are dropped first).
+
+        labyrinth: Labyrinth, the grids are recomputed when walls are added
+        resolution: edge length of a cell in meters
+        lightResolution: light positions are rounded to this in meters
+        cacheSize: maximum number of cached grids
+    """
+    def __init__(self, labyrinth, resolution=0.01, lightResolution=0.01,
+            cacheSize=64):
+        self.labyrinth = labyrinth
+        self.resolution = resolution
+        self.lightResolution = lightResolution
+        self.cacheSize = cacheSize
+
+        self.grids = OrderedDict()
+        self.numWalls = None
+
+        self.hits = 0
+        self.misses = 0
+
+    def _updateWalls(self):
+        boxes = self.labyrinth.getWallBoxes()
+        if boxes.shape[0] == self.numWalls:
+            return
+
+        self.boxes = boxes
+        self.numWalls = boxes.shape[0]
+        self.grids.clear()
+
+        # the grid covers the bounding box of the walls
+        if self.numWalls > 0:
+            self.origin = boxes[:, 0:2].min(axis=0)
+            size = boxes[:, 2:4].max(axis=0) - self.origin
+        else:
+            self.origin = zeros(2)
+            size = zeros(2)
+
+        self.shape = maximum(ceil(size / self.resolution), 1).astype(int)
+
+        cx = self.origin[0] + (arange(self.shape[0]) + 0.5) * self.resolution
+        cy = self.origin[1] + (arange(self.shape[1]) + 0.5) * self.resolution
+        X, Y = meshgrid(cx, cy, indexing='ij')
+        self.centres = column_stack([X.ravel(), Y.ravel()])
+
+    def _quantize(self, lightPos):
+        return tuple(int(k) for k in
+                     around(reshape(lightPos, 2) / self.lightResolution))
+
+    """
+        returns the visibility grid (shape[0] x shape[1] booleans, indexed
+        by x and y cell) for the rounded light position
+    """
+    def getGrid(self, lightPos):
+        self._updateWalls()
+
+        key = self._quantize(lightPos)
+        if key in self.grids:
+            self.hits += 1
+            self.grids.move_to_end(key)
+            return self.grids[key]
+
+        self.misses += 1
+
+        light = array(key) * self.lightResolution
+        ends = repeat(light.reshape(1, 2), self.centres.shape[0], axis=0)
+        occluded = segmentsCrossBoxes(self.centres, ends, self.boxes)
+        grid = (~occluded).reshape(self.shape)
+
+        self.grids[key] = grid
+        while len(self.grids) > self.cacheSize:
+            self.grids.popitem(last=False)
+
+        return grid
+
+    """
+        points: n x 2 in real world coords
+
+        returns n booleans, True where the light can be seen, points outside
+        of the labyrinth use the closest cell
+    """
+    def isVisible(self, points, lightPos):
+        grid = self.getGrid(lightPos)
+
+        cells = floor((points - self.origin) / self.resolution).astype(int)
+        cells = clip(cells, 0, self.shape - 1)
+
+        return grid[cells[:, 0], cells[:, 1]]
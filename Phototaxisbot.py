@@ -1,31 +1,56 @@
 from Kilobot import Kilobot
-from numpy import array
-from numpy.linalg import norm
-from Box2D.b2 import *
+from Box2D.b2 import vec2
 
 
 class Phototaxisbot(Kilobot):
     def __init__(self, world, scale_real_to_sim, scale_real_to_vis, pos, env):
         Kilobot.__init__(self, world, scale_real_to_sim, scale_real_to_vis, pos)
 
-        self.scale_sim_to_real = 1.0 / scale_real_to_sim
-
         self.last_light = 0
         self.turn_cw = 1
         self.counter = 0
 
         self.env = env
 
-    def step(self):
-        # TODO better method to simulate the ambient light sensor
-        # (multiple lights?)
+    def getControllerState(self):
+        return Kilobot.getControllerState(self) + \
+                [self.last_light, self.turn_cw, self.counter]
+
+    def setControllerState(self, state):
+        Kilobot.setControllerState(self, state[:2])
+        self.last_light = float(state[2])
+        self.turn_cw = int(state[3])
+        self.counter = int(state[4])
+
+    """
+        returns the light sensor reading and the distance to the light
+    """
+    def _readLight(self):
+        light_field = self.env.get('light_field', None)
+        swarm_index = getattr(self, 'swarm_index', None)
+
+        if light_field is not None and swarm_index is not None:
+            return (light_field.readings[swarm_index],
+                    light_field.distances[swarm_index])
+
+        # single light at env['light_pos'] without a LightField (the old
+        # linear model)
         light = self.env['light_pos']
 
-        pos_real = self.scale_sim_to_real * \
-                   self.body.GetWorldPoint((0.0, self.sim_radius))
+        pos_real = self.body.GetWorldPoint((0.0, self.sim_radius)) / \
+                   self.scale_real_to_sim
         dist = (pos_real - vec2(light[0, 0], light[0, 1])).length
 
-        current_light = 1.0 - dist
+        return (1.0 - dist, dist)
+
+    """
+        env['light_field'] is the LightField of the swarm, it has to be
+        updated before the kilobots are stepped. Without one (or if the
+        kilobot isn't part of a Swarm) the kilobot senses a single light at
+        env['light_pos'].
+    """
+    def step(self):
+        current_light, dist = self._readLight()
 
         # TODO better phototaxis algorithm?
         if dist > 0.01:
@@ -0,0 +1,46 @@
+"""
+    Physics engines the simulators can run on.
+
+    'box2d' is pybox2d with its full rigid body contact solver (friction
+    between kilobots and object), the setting the simulator always used.
+    'discs' is the NumPy engine of DiscPhysics: frictionless position based
+    contacts computed for all bodies at once, for large swarms. Both accept
+    the same physics profiles (substeps and position iterations).
+
+    Physics time per control step (pushing, quad, precise profile, measured
+    with 'benchmark.py --backends box2d discs --steps 20'):
+
+        kilobots    box2d       discs
+            10      0.1 ms      3.5 ms
+           100      1.0 ms      6.8 ms
+          1000     13.5 ms     13.9 ms
+          2000     > 30 s      21 ms
+          5000        -        64 ms
+         10000        -       104 ms
+
+    The discs engine has a fixed NumPy overhead per substep and only pays
+    off from about 1000 kilobots on, where Box2D breaks down in the dense
+    pushing formation.
+"""
+
+from Box2D.b2 import world
+
+from DiscPhysics import DiscWorld
+
+
+BACKENDS = ('box2d', 'discs')
+
+DEFAULT_BACKEND = 'box2d'
+
+
+"""
+    returns an empty world without gravity
+"""
+def createWorld(name=DEFAULT_BACKEND):
+    if name == 'box2d':
+        return world(gravity=(0, 0), doSleep=True)
+    elif name == 'discs':
+        return DiscWorld(gravity=(0, 0), doSleep=True)
+
+    raise ValueError('unknown physics backend \'{}\', use one of {}'
+            .format(name, list(BACKENDS)))
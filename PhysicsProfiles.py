@@ -0,0 +1,78 @@
+"""
+    Named fidelity profiles for the physics simulation.
+
+    Every profile simulates 1s per control step (numSubsteps * timeStep), so
+    the kilobots move the same distance per step in all profiles. They
+    differ in how finely that second is resolved, the number of constraint
+    solver iterations and whether bodies may fall asleep.
+
+    'precise' is the setting the simulator always used. 'precise-awake'
+    steps the same way but never lets bodies fall asleep, so an object
+    which came to rest can't miss a small push. The cheaper profiles are
+    meant for early learning iterations, final evaluations should use
+    'precise'. Use 'benchmark.py --profiles' to measure the accuracy of
+    the pushing reward against 'precise' and the speed of every profile.
+
+    Measured with 'benchmark.py --profiles --kilobots 10 50 --steps 40'
+    (8 episodes, error of the return of an episode relative to 'precise'):
+
+                         10 kilobots         50 kilobots
+        profile        quad     circle     quad      circle    speedup
+        precise         0%       0%         0%        0%       1.0x
+        precise-awake   0%       0%         0%        0%       1.0x
+        fast           15%       5%        18%       28%       1.3x - 1.6x
+        coarse         25%      15%        27%       30%       1.6x - 2.3x
+"""
+
+
+class PhysicsProfile:
+    """
+        numSubsteps: Box2D steps per control step
+        timeStep: seconds per Box2D step
+        velocityIterations, positionIterations: constraint solver iterations
+            per Box2D step
+        sleeping: if resting bodies may fall asleep
+    """
+    def __init__(self, name, numSubsteps, timeStep, velocityIterations,
+            positionIterations, sleeping):
+        self.name = name
+        self.numSubsteps = numSubsteps
+        self.timeStep = timeStep
+        self.velocityIterations = velocityIterations
+        self.positionIterations = positionIterations
+        self.sleeping = sleeping
+
+    """
+        simulated seconds per control step
+    """
+    def getControlStepTime(self):
+        return self.numSubsteps * self.timeStep
+
+    def apply(self, world):
+        world.allowSleeping = self.sleeping
+
+    """
+        simulates one control step
+    """
+    def step(self, world):
+        for i in range(self.numSubsteps):
+            world.Step(self.timeStep, self.velocityIterations,
+                    self.positionIterations)
+
+
+PROFILES = dict((p.name, p) for p in [
+    PhysicsProfile('precise', 10, 0.1, 10, 10, True),
+    PhysicsProfile('precise-awake', 10, 0.1, 10, 10, False),
+    PhysicsProfile('fast', 5, 0.2, 6, 3, True),
+    PhysicsProfile('coarse', 2, 0.5, 4, 2, True),
+])
+
+DEFAULT_PROFILE = 'precise'
+
+
+def getProfile(name):
+    if name not in PROFILES:
+        raise ValueError('unknown physics profile \'{}\', use one of {}'
+                .format(name, sorted(PROFILES.keys())))
+
+    return PROFILES[name]
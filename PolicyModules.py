@@ -0,0 +1,178 @@
+import hashlib
+import importlib
+import importlib.abc
+import importlib.util
+import os
+import pickle
+import sys
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+
+"""
+    returns the hex digest of the sha1 hash of data (bytes or str)
+"""
+def contentHash(data):
+    if isinstance(data, str):
+        data = data.encode('utf-8')
+
+    return hashlib.sha1(data).hexdigest()
+
+
+class PolicyModuleCache(importlib.abc.MetaPathFinder, importlib.abc.Loader):
+    """
+        Policy modules sent by the learner ('sentPolicyModules'), loaded
+        in memory from their source instead of being written to the
+        working directory. A module is only loaded again after its source
+        changed, the modules may import each other.
+
+        The cache is an import finder, it is added to sys.meta_path when
+        the first modules are sent.
+    """
+    def __init__(self):
+        # module name -> (file name, source, hash)
+        self.sources = {}
+
+        # loaded modules by name
+        self.modules = {}
+
+        self.loads = 0
+
+    """
+        modules: list of (fileName, source) as sent by the learner
+
+        returns True if any source changed
+    """
+    def update(self, modules):
+        if self not in sys.meta_path:
+            sys.meta_path.insert(0, self)
+
+        changed = False
+        for fileName, source in modules:
+            name, ext = os.path.splitext(os.path.basename(fileName))
+            if ext != '.py':
+                continue
+
+            sourceHash = contentHash(source)
+            if name in self.sources and self.sources[name][2] == sourceHash:
+                continue
+
+            self.sources[name] = (fileName, source, sourceHash)
+            changed = True
+
+        if changed:
+            # modules which weren't changed may import changed ones, and
+            # stale modules of the same name may have been imported before
+            for name in self.sources:
+                sys.modules.pop(name, None)
+            self.modules.clear()
+
+        return changed
+
+    """
+        returns the module, loaded from its source if necessary
+    """
+    def get(self, name):
+        if name not in self.modules:
+            if name not in self.sources:
+                raise ImportError('policy module \'{}\' was not sent'
+                        .format(name))
+
+            self.modules[name] = importlib.import_module(name)
+
+        return self.modules[name]
+
+    """
+        returns a hash of the sources of all modules (a module may depend
+        on the others)
+    """
+    def getHash(self):
+        return contentHash(''.join(sorted(h for (f, s, h)
+                                          in self.sources.values())))
+
+    """ importlib.abc.MetaPathFinder """
+    def find_spec(self, name, path=None, target=None):
+        if name not in self.sources:
+            return None
+
+        return importlib.util.spec_from_loader(name, self,
+                origin=self.sources[name][0])
+
+    """ importlib.abc.Loader """
+    def exec_module(self, module):
+        fileName, source, sourceHash = self.sources[module.__name__]
+        module.__file__ = fileName
+
+        self.modules[module.__name__] = module
+        self.loads += 1
+
+        exec(compile(source, fileName, 'exec'), module.__dict__)
+
+
+class PolicyCache:
+    """
+        Policies deserialized with fromSerializableDict of their module,
+        keyed by the hash of the module sources and the hash of the policy
+        dict. The least recently used policies are dropped first.
+
+        A policy can be deserialized in a background thread (prefetch)
+        while the previous request is still being simulated.
+
+        moduleCache: PolicyModuleCache the policy modules are taken from
+        maxSize: maximum number of policies
+    """
+    def __init__(self, moduleCache, maxSize=8):
+        self.moduleCache = moduleCache
+        self.maxSize = maxSize
+
+        # key -> future of the policy
+        self.policies = OrderedDict()
+        self.executor = ThreadPoolExecutor(1)
+
+        self.hits = 0
+        self.misses = 0
+
+    def _key(self, moduleName, policyDict):
+        return (moduleName, self.moduleCache.getHash(),
+                contentHash(pickle.dumps(policyDict, protocol=2)))
+
+    def _submit(self, key, moduleName, policyDict):
+        module = self.moduleCache.get(moduleName)
+
+        if key in self.policies:
+            self.hits += 1
+            self.policies.move_to_end(key)
+            return self.policies[key]
+
+        self.misses += 1
+        future = self.executor.submit(module.fromSerializableDict, policyDict)
+        self.policies[key] = future
+
+        while len(self.policies) > self.maxSize:
+            self.policies.popitem(last=False)
+
+        return future
+
+    """
+        starts deserializing the policy in the background
+    """
+    def prefetch(self, moduleName, policyDict):
+        self._submit(self._key(moduleName, policyDict), moduleName,
+                policyDict)
+
+    """
+        returns the policy, waits for it if it is being deserialized
+    """
+    def get(self, moduleName, policyDict):
+        key = self._key(moduleName, policyDict)
+        future = self._submit(key, moduleName, policyDict)
+
+        try:
+            return future.result()
+        except Exception:
+            # a failed policy is deserialized again by the next request
+            self.policies.pop(key, None)
+            raise
+
+    def clear(self):
+        self.policies.clear()
@@ -0,0 +1,151 @@
+"""
+    Timing instrumentation for the phases of a simulation step.
+
+    A PhaseTimer keeps per phase the number of measurements, the total
+    and the maximum time and a histogram of the times in quarter decades
+    (HISTOGRAM_EDGES). Disabled timers cost one attribute lookup per phase.
+
+    getTimings returns a dict which can be sent to the learner:
+
+        phases: per phase {'count', 'totalSeconds', 'meanSeconds',
+                           'maxSeconds', 'histogram'}
+        histogramEdges: bin edges of the histograms (seconds), the first and
+            the last bin also count the times below / above the edges
+        wallSeconds: time since the timer was reset
+"""
+
+import cProfile
+import math
+import time
+
+
+HISTOGRAM_MIN_EXP = -7  # 100ns
+HISTOGRAM_MAX_EXP = 1  # 10s
+HISTOGRAM_BINS_PER_DECADE = 4
+HISTOGRAM_EDGES = [10.0 ** (float(e) / HISTOGRAM_BINS_PER_DECADE) for e in
+                   range(HISTOGRAM_MIN_EXP * HISTOGRAM_BINS_PER_DECADE,
+                         HISTOGRAM_MAX_EXP * HISTOGRAM_BINS_PER_DECADE + 1)]
+NUM_HISTOGRAM_BINS = len(HISTOGRAM_EDGES) + 1
+
+
+class PhaseTimer:
+    """
+        enabled: if False nothing is measured
+    """
+    def __init__(self, enabled=False):
+        self.enabled = enabled
+        self.reset()
+
+    def reset(self):
+        self.counts = {}
+        self.totals = {}
+        self.maxima = {}
+        self.histograms = {}
+
+        self.startTime = time.perf_counter()
+
+    """
+        returns the current time if enabled, else 0
+    """
+    def now(self):
+        if not self.enabled:
+            return 0.0
+
+        return time.perf_counter()
+
+    """
+        records the time since start for phase
+
+        returns the current time, the start of the next phase
+    """
+    def lap(self, phase, start):
+        if not self.enabled:
+            return 0.0
+
+        now = time.perf_counter()
+        self.record(phase, now - start)
+
+        return now
+
+    def _addPhase(self, phase):
+        if phase not in self.counts:
+            self.counts[phase] = 0
+            self.totals[phase] = 0.0
+            self.maxima[phase] = 0.0
+            self.histograms[phase] = [0] * NUM_HISTOGRAM_BINS
+
+    def record(self, phase, seconds):
+        self._addPhase(phase)
+
+        self.counts[phase] += 1
+        self.totals[phase] += seconds
+        self.maxima[phase] = max(self.maxima[phase], seconds)
+
+        if seconds > 0.0:
+            b = int(math.floor(math.log10(seconds) *
+                    HISTOGRAM_BINS_PER_DECADE)) - \
+                HISTOGRAM_MIN_EXP * HISTOGRAM_BINS_PER_DECADE + 1
+            b = min(max(b, 0), NUM_HISTOGRAM_BINS - 1)
+        else:
+            b = 0
+        self.histograms[phase][b] += 1
+
+    """
+        adds the timings of another timer (see getTimings), e.g. of a
+        worker process
+    """
+    def merge(self, timings):
+        for (phase, t) in timings['phases'].items():
+            self._addPhase(phase)
+
+            self.counts[phase] += t['count']
+            self.totals[phase] += t['totalSeconds']
+            self.maxima[phase] = max(self.maxima[phase], t['maxSeconds'])
+            self.histograms[phase] = [a + b for (a, b) in
+                    zip(self.histograms[phase], t['histogram'])]
+
+    def getTimings(self):
+        phases = {}
+        for phase in self.counts:
+            phases[phase] = {'count': self.counts[phase],
+                             'totalSeconds': self.totals[phase],
+                             'meanSeconds': self.totals[phase] /
+                                            max(1, self.counts[phase]),
+                             'maxSeconds': self.maxima[phase],
+                             'histogram': list(self.histograms[phase])}
+
+        return {'phases': phases,
+                'histogramEdges': list(HISTOGRAM_EDGES),
+                'wallSeconds': time.perf_counter() - self.startTime}
+
+
+"""
+    runs f() under cProfile and writes the profile to path (readable with
+    pstats or snakeviz), the profile isn't written if path is None
+
+    returns the result of f
+"""
+def profileCall(path, f, *args, **kwargs):
+    if path is None:
+        return f(*args, **kwargs)
+
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(f, *args, **kwargs)
+    finally:
+        profile.dump_stats(path)
+
+
+"""
+    prints the timings (see PhaseTimer.getTimings) per phase
+"""
+def printTimings(timings):
+    phases = sorted(timings['phases'].items(),
+                    key=lambda p: -p[1]['totalSeconds'])
+
+    print('{:>12} {:>9} {:>11} {:>11} {:>11}'.format(
+            'phase', 'count', 'total s', 'mean ms', 'max ms'))
+    for (phase, t) in phases:
+        print('{:>12} {:>9} {:>11.4f} {:>11.4f} {:>11.4f}'.format(phase,
+                t['count'], t['totalSeconds'], t['meanSeconds'] * 1000.0,
+                t['maxSeconds'] * 1000.0))
@@ -0,0 +1,263 @@
+from Box2D.b2 import*
+from pygame import gfxdraw
+
+from Object import Object
+from Kilobot import Kilobot
+from Swarm import Swarm
+from SwarmRenderer import SwarmRenderer
+from PhysicsProfiles import getProfile, DEFAULT_PROFILE
+from Snapshot import takeSnapshot, restoreSnapshot
+
+from numpy import *
+
+
+class PushingWorld:
+    """
+        Kilobots which move directly to the light and an object they push,
+        all in one Box2D world.
+        Several of them can be stepped in lockstep (one episode each).
+        How a control step is simulated is set by a PhysicsProfile.
+        The bodies are reused across episodes and requests, use resize() to
+        change the number of kilobots or the object shape.
+
+        world: Box2D world the bodies are created in
+        scale_real_to_sim: scale factor to go from real world to
+            simulation coords (for numerical reasons)
+        scale_real_to_vis: scale factor to go from real world to
+            visualisation coords (meter to pixels)
+    """
+    def __init__(self, world, scale_real_to_sim, scale_real_to_vis,
+            numKilobots, objectShape):
+        self.world = world
+        self.scale_real_to_sim = scale_real_to_sim
+        self.scale_real_to_vis = scale_real_to_vis
+
+        self.kilobots = []
+        self.swarm = Swarm(self.kilobots, scale_real_to_sim)
+        self.pushObject = None
+        self.resize(numKilobots, objectShape)
+
+        self.setProfile(getProfile(DEFAULT_PROFILE))
+
+        self.lightPos = None
+
+        # created when the world is drawn first
+        self.swarmRenderer = None
+
+    """
+        only creates or destroys the bodies which differ from the current
+        configuration
+    """
+    def resize(self, numKilobots, objectShape):
+        while len(self.kilobots) > numKilobots:
+            self.kilobots.pop().destroy()
+
+        while len(self.kilobots) < numKilobots:
+            kilobot = Kilobot(self.world, self.scale_real_to_sim,
+                    self.scale_real_to_vis, [0, 0])
+            kilobot.fixture.friction = 20
+            kilobot.body.linearDamping = 0.0
+
+            self.kilobots += [kilobot]
+
+        self.swarm.setKilobots(self.kilobots)
+
+        if self.pushObject is None or self.pushObject.shape != objectShape:
+            if self.pushObject is not None:
+                self.pushObject.destroy()
+
+            self.pushObject = Object(self.world, self.scale_real_to_sim,
+                    self.scale_real_to_vis, [0, 0], objectShape)
+
+    """
+        replaces the Box2D world by a new one with the same bodies (not
+        placed yet), so nothing of the previous simulation (contacts,
+        broadphase) is left and the same steps lead to the same results.
+        Only possible if the world contains nothing but this PushingWorld.
+    """
+    def rebuild(self):
+        if self.world.bodyCount != len(self._bodies()):
+            raise ValueError('the world contains bodies which don\'t ' +
+                    'belong to this PushingWorld')
+
+        numKilobots = len(self.kilobots)
+        objectShape = self.pushObject.shape
+
+        # the old bodies are freed with the old world (of the same backend)
+        self.world = type(self.world)(gravity=(0, 0), doSleep=True)
+        self.kilobots = []
+        self.pushObject = None
+        self.resize(numKilobots, objectShape)
+
+        self.profile.apply(self.world)
+
+    def setProfile(self, profile):
+        self.profile = profile
+        self.profile.apply(self.world)
+
+    """
+        removes all bodies from the world
+    """
+    def destroy(self):
+        for kilobot in self.kilobots:
+            kilobot.destroy()
+        self.kilobots = []
+        self.swarm.setKilobots(self.kilobots)
+
+        self.pushObject.destroy()
+        self.pushObject = None
+
+    """
+        objStart: object position (x, y)
+        lightStart: light position (x, y)
+        kilobotOffsets: 4 x 2 offsets of the kilobot formation
+        kilobotStart: center of the kilobot formation, lightStart if None
+        kilobotJitter: numKilobots x 2 displacements of the kilobots from
+            the formation or None
+    """
+    def reset(self, objStart, lightStart, kilobotOffsets, kilobotStart=None,
+            kilobotJitter=None):
+        if kilobotStart is None:
+            kilobotStart = lightStart
+
+        self.pushObject.body.position = vec2(objStart[0], objStart[1]) *\
+                self.scale_real_to_sim
+        self.pushObject.body.angle = 0
+        self.pushObject.body.linearVelocity = vec2(0, 0)
+        self.pushObject.body.angularVelocity = 0
+        self.pushObject.body.awake = True
+
+        self.lightPos = matrix(lightStart)
+
+        # kilobots start in a fixed formation
+        for (i, kilobot) in enumerate(self.kilobots):
+            x = kilobotStart[0] + (1 + i // 4) * kilobotOffsets[i % 4, 0]
+            y = kilobotStart[1] + (1 + i // 4) * kilobotOffsets[i % 4, 1]
+            if kilobotJitter is not None:
+                x += kilobotJitter[i, 0]
+                y += kilobotJitter[i, 1]
+            kilobot.body.position = vec2(x, y) * self.scale_real_to_sim
+            kilobot.body.angle = 0
+            kilobot.body.angularVelocity = 0
+            kilobot.body.awake = True
+
+        self.swarm.update()
+
+    def _bodies(self):
+        return [self.pushObject.body] + self.swarm.bodies
+
+    """
+        rng: numpy RandomState saved with the world if not None
+
+        returns the state of the world as bytes (see Snapshot)
+    """
+    def getSnapshot(self, rng=None):
+        return takeSnapshot(self._bodies(), lights=self.lightPos, rng=rng)
+
+    """
+        the world has to have the numKilobots and objectShape of the
+        snapshot, call rebuild() before to continue exactly the same way
+        every time the snapshot is restored
+    """
+    def restoreSnapshot(self, snapshot, rng=None):
+        lights = restoreSnapshot(snapshot, self._bodies(), rng=rng)
+        self.lightPos = asmatrix(lights)
+
+        self.swarm.update()
+
+    """
+        lets the start formation resolve its overlaps while the kilobots
+        don't drive, numSteps control steps
+    """
+    def settle(self, numSteps):
+        stop = zeros((len(self.kilobots), 2))
+
+        for i in range(numSteps):
+            self.swarm.setLinearVelocities(stop)
+            self.stepPhysics()
+
+        for body in self._bodies():
+            body.linearVelocity = vec2(0, 0)
+            body.angularVelocity = 0
+
+        self.swarm.update()
+
+    """
+        friction of the kilobots and the object, part of the start state
+    """
+    def getFrictions(self):
+        return (self.kilobots[0].fixture.friction if self.kilobots else None,
+                self.pushObject.fixture.friction)
+
+    """
+        s: light.x light.y kb.x1 kb.y1 ... kb.xn kb.yn
+           everything is relative to the object position
+    """
+    def getState(self):
+        objPos = self.pushObject.getRealPosition()
+
+        s = asmatrix(empty((1, 2 + 2 * len(self.kilobots))))
+        s[0, 0:2] = self.lightPos - objPos
+        s[0, 2:] = (self.swarm.positions - objPos).reshape(1, -1)
+
+        return s
+
+    """
+        returns (1 + numKilobots) x 3 array: x, y, angle of the object and
+        the kilobots in real world coords (see Trajectory)
+    """
+    def getPoses(self):
+        poses = empty((1 + len(self.kilobots), 3))
+        poses[0, 0:2] = self.pushObject.getRealPosition()
+        poses[0, 2] = self.pushObject.body.angle
+        poses[1:, 0:2] = self.swarm.positions
+        poses[1:, 2] = self.swarm.angles
+
+        return poses
+
+    """
+        a: light movement (dx, dy), capped to 0.015
+    """
+    def moveLight(self, a):
+        n = linalg.norm(a)
+        if n > 0.015:
+            self.lightPos += (a * 0.015 / n)
+        else:
+            self.lightPos += a
+
+    def step(self):
+        self.moveTowardLight()
+        self.stepPhysics()
+        self.swarm.update()
+
+    """
+        sets the kilobot velocities to move directly toward the light
+    """
+    def moveTowardLight(self):
+        v = asarray(self.lightPos) - self.swarm.positions
+
+        # cap max velocity
+        n = sqrt((v ** 2).sum(axis=1))
+        tooFast = n > 0.01
+        v[tooFast, :] *= (0.01 / n[tooFast])[:, newaxis]
+
+        self.swarm.setLinearVelocities(v)
+
+    def stepPhysics(self):
+        self.profile.step(self.world)
+
+    def draw(self, screen):
+        self.pushObject.draw(screen)
+
+        # all kilobots at once from the swarm state
+        if self.swarmRenderer is None:
+            self.swarmRenderer = SwarmRenderer(self.scale_real_to_vis)
+        self.swarmRenderer.draw(screen, self.swarm.positions,
+                                self.swarm.angles)
+
+        # draw light
+        lx = int(self.scale_real_to_vis * self.lightPos[0, 0])
+        ly = int(screen.get_height() - self.scale_real_to_vis *
+                self.lightPos[0, 1])
+        lr = int(self.scale_real_to_vis * 0.02)
+        gfxdraw.aacircle(screen, lx, ly, lr, (255, 255, 0))
@@ -0,0 +1,48 @@
+import pygame
+
+import time
+
+
+class Renderer:
+    """
+        Draws the scene independently of how fast the simulation is stepped.
+        step() has to be called after every simulation step, it only draws
+        every frameSkip-th step and at most maxFps times per second.
+
+        screen: pygame display surface
+        draw: function which draws the scene, called as draw(screen)
+        maxFps: maximum number of frames per second, no limit if None
+        frameSkip: only every frameSkip-th simulation step is drawn
+    """
+    def __init__(self, screen, draw, maxFps=30, frameSkip=1):
+        self.screen = screen
+        self.draw = draw
+
+        self.maxFps = maxFps
+        self.frameSkip = max(1, frameSkip)
+
+        self.numSteps = 0
+        self.numFrames = 0
+        self.lastFrameTime = None
+
+    """
+        returns True if a frame was drawn
+    """
+    def step(self):
+        self.numSteps += 1
+
+        if self.numSteps % self.frameSkip != 0:
+            return False
+
+        now = time.time()
+        if self.maxFps is not None and self.lastFrameTime is not None and \
+                now - self.lastFrameTime < 1.0 / self.maxFps:
+            return False
+
+        self.lastFrameTime = now
+        self.numFrames += 1
+
+        self.draw(self.screen)
+        pygame.display.flip()
+
+        return True
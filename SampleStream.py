@@ -0,0 +1,63 @@
+"""
+    Streaming transport for samples.
+
+    Instead of one pickled 'sentSamples' message after all episodes, every
+    episode is sent as soon as it is finished as one multipart message:
+
+        frame 0: pickled header {'message': 'sentEpisodeSamples',
+                                 'episode': episode index,
+                                 'dtype': dtype of the samples,
+                                 'shapes': shapes of S, A, R, S_}
+        frame 1 - 4: raw (C-contiguous) buffers of S, A, R, S_
+
+    The buffers are sent without copying them. After the last episode a
+    single pickled {'message': 'sentSamplesEnd', 'numEpisodes': n} follows,
+    with the 'timings' of the request if profiling is enabled (see
+    Profiling).
+"""
+
+import pickle
+
+from numpy import ascontiguousarray, frombuffer, asmatrix
+
+
+"""
+    samples: (S, A, R, S_) of one episode, must not be changed afterwards
+"""
+def sendEpisodeSamples(socket, episode, samples):
+    buffers = [ascontiguousarray(x) for x in samples]
+
+    header = {'message': 'sentEpisodeSamples',
+              'episode': int(episode),
+              'dtype': buffers[0].dtype.str,
+              'shapes': [x.shape for x in buffers]}
+
+    socket.send_multipart([pickle.dumps(header, protocol=2)] + buffers,
+            copy=False)
+
+
+def sendSamplesEnd(socket, numEpisodes, timings=None):
+    msg = {'message': 'sentSamplesEnd', 'numEpisodes': numEpisodes}
+    if timings is not None:
+        msg['timings'] = timings
+    socket.send(pickle.dumps(msg, protocol=2))
+
+
+"""
+    learner side, frames as returned by socket.recv_multipart(copy=False)
+
+    returns the header and the (S, A, R, S_) matrices of one episode
+    or the header and None for the 'sentSamplesEnd' message
+"""
+def decodeEpisodeSamples(frames):
+    header = pickle.loads(frames[0].bytes
+                          if hasattr(frames[0], 'bytes') else frames[0])
+
+    if header['message'] != 'sentEpisodeSamples':
+        return header, None
+
+    samples = tuple(asmatrix(frombuffer(frame, dtype=header['dtype'])
+                             .reshape(shape))
+                    for (frame, shape) in zip(frames[1:], header['shapes']))
+
+    return header, samples
@@ -0,0 +1,60 @@
+from zmq import Context, DEALER, POLLIN
+
+import pickle
+
+
+class SimulationClient:
+    """
+        Learner side of simulation_server.py. Requests are sent without
+        waiting for the answers, every answer carries the 'requestId' of its
+        request.
+
+        address: address of the server, e.g. 'tcp://localhost:2359'
+    """
+    def __init__(self, address='tcp://localhost:2359', context=None):
+        self.context = context or Context.instance()
+        self.socket = self.context.socket(DEALER)
+        self.socket.connect(address)
+
+        self.nextRequestId = 0
+
+    def close(self):
+        self.socket.close(linger=0)
+
+    """
+        modules: list of (fileName, source)
+        policyModule, objPolicyModule, mazePolicyModule: module names as in
+            the messages to the simulate scripts
+    """
+    def sendPolicyModules(self, modules, **moduleNames):
+        msg = {'message': 'sentPolicyModules', 'modules': list(modules)}
+        msg.update(moduleNames)
+        self.socket.send(pickle.dumps(msg, protocol=2))
+
+    """
+        msg: 'getSamples' or 'testMaze' message, gets a 'requestId' if it
+            doesn't have one
+
+        returns the request id
+    """
+    def send(self, msg):
+        msg = dict(msg)
+        if msg.get('requestId', None) is None:
+            msg['requestId'] = self.nextRequestId
+            self.nextRequestId += 1
+
+        self.socket.send(pickle.dumps(msg, protocol=2))
+
+        return msg['requestId']
+
+    """
+        timeout: milliseconds to wait for an answer, forever if None
+
+        returns the next answer or None after the timeout
+    """
+    def recv(self, timeout=None):
+        if timeout is not None and \
+                not self.socket.poll(timeout, POLLIN):
+            return None
+
+        return pickle.loads(self.socket.recv())
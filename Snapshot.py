@@ -0,0 +1,129 @@
+"""
+    Binary snapshots of the simulation state.
+
+    A snapshot holds the pose and velocity of Box2D bodies, the state of
+    the kilobot controllers (getControllerState / setControllerState), the
+    light positions and the state of a numpy RandomState. It is serialized
+    as
+
+        frame 0: 4 byte length of the header
+        frame 1: pickled header {'shapes': shapes of the arrays,
+                                 'controllerSizes': values per controller,
+                                 'rng': RandomState state without the key}
+        frame 2: raw float64 buffers of bodies, controllers and lights
+                 followed by the uint32 key of the RandomState
+
+    Box2D keeps contacts (and their impulses for warm starting) between
+    steps, they are not part of a snapshot. Restoring drops all contacts so
+    they are rebuilt from the restored poses, but the broadphase of the
+    world still depends on what was simulated before. A snapshot only
+    always continues the same way if it is restored into a fresh world
+    (PushingWorld.rebuild() first), and even then not bit for bit like the
+    run the snapshot was taken from.
+"""
+
+import pickle
+import struct
+
+from numpy import asarray, ascontiguousarray, concatenate, empty, float64, \
+        frombuffer, prod, uint32, zeros
+
+
+BODY_VALUES = 7  # x, y, angle, vx, vy, angular velocity, awake
+
+
+"""
+    bodies: Box2D bodies (sim coords)
+    controllers: objects with getControllerState() / setControllerState()
+    lights: light positions (n x 2) or None
+    rng: numpy RandomState or None
+
+    returns the snapshot as bytes
+"""
+def takeSnapshot(bodies, controllers=(), lights=None, rng=None):
+    bodyStates = empty((len(bodies), BODY_VALUES))
+    for (i, body) in enumerate(bodies):
+        bodyStates[i] = (body.position.x, body.position.y, body.angle,
+                         body.linearVelocity.x, body.linearVelocity.y,
+                         body.angularVelocity, body.awake)
+
+    controllerStates = [asarray(c.getControllerState(), dtype=float64)
+                        for c in controllers]
+    controllerSizes = [len(x) for x in controllerStates]
+    controllerStates = concatenate([zeros(0)] + controllerStates)
+
+    lights = zeros((0, 2)) if lights is None else \
+            asarray(lights, dtype=float64).reshape(-1, 2)
+
+    if rng is not None:
+        algorithm, key, pos, hasGauss, cachedGauss = rng.get_state()
+        rngState = (algorithm, int(pos), int(hasGauss), float(cachedGauss))
+        key = asarray(key, dtype=uint32)
+    else:
+        rngState = None
+        key = zeros(0, dtype=uint32)
+
+    buffers = [bodyStates, controllerStates, lights, key]
+
+    header = pickle.dumps({'shapes': [x.shape for x in buffers],
+                           'controllerSizes': controllerSizes,
+                           'rng': rngState}, protocol=2)
+
+    return struct.pack('<I', len(header)) + header + \
+            b''.join(ascontiguousarray(x).tobytes() for x in buffers)
+
+
+"""
+    bodies, controllers and rng as given to takeSnapshot, they are set to
+    the state in the snapshot
+
+    returns the light positions (n x 2)
+"""
+def restoreSnapshot(snapshot, bodies, controllers=(), rng=None):
+    headerSize, = struct.unpack_from('<I', snapshot, 0)
+    header = pickle.loads(snapshot[4:4 + headerSize])
+
+    offset = 4 + headerSize
+    buffers = []
+    for (shape, dtype) in zip(header['shapes'],
+                              [float64, float64, float64, uint32]):
+        count = int(prod(shape))
+        buffers.append(frombuffer(snapshot, dtype=dtype, count=count,
+                                  offset=offset).reshape(shape))
+        offset += count * dtype().itemsize
+    bodyStates, controllerStates, lights, key = buffers
+
+    if bodyStates.shape[0] != len(bodies) or \
+            len(header['controllerSizes']) != len(controllers):
+        raise ValueError('snapshot of {} bodies and {} controllers can\'t be '
+                'restored to {} bodies and {} controllers'.format(
+                bodyStates.shape[0], len(header['controllerSizes']),
+                len(bodies), len(controllers)))
+
+    # drop the contacts, they belong to the old poses
+    for body in bodies:
+        body.active = False
+
+    for (body, state) in zip(bodies, bodyStates):
+        x, y, angle, vx, vy, w, awake = state
+        body.position = (x, y)
+        body.angle = angle
+        body.active = True
+
+        # putting the body to sleep resets the time it has been resting
+        body.awake = False
+        if awake:
+            body.awake = True
+            body.linearVelocity = (vx, vy)
+            body.angularVelocity = w
+
+    start = 0
+    for (c, size) in zip(controllers, header['controllerSizes']):
+        c.setControllerState(controllerStates[start:start + size])
+        start += size
+
+    if rng is not None and header['rng'] is not None:
+        algorithm, pos, hasGauss, cachedGauss = header['rng']
+        rng.set_state((algorithm, key.copy(), pos, hasGauss, cachedGauss))
+
+    return lights.copy()
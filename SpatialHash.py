@@ -0,0 +1,89 @@
+from numpy import *
+
+
+class SpatialHash:
+    # cell coordinates are packed into one integer key
+    CELL_OFFSET = 2 ** 20
+    CELL_STRIDE = 2 ** 21
+
+    """
+        Uniform grid for fixed radius neighbour queries.
+        build() sorts the points by grid cell, a query only looks at the
+        3 x 3 cells around every point, so the radius must not be larger
+        than the cell size.
+
+        cellSize: edge length of a grid cell (same units as the points)
+    """
+    def __init__(self, cellSize):
+        self.cellSize = cellSize
+
+        self.points = zeros((0, 2))
+        self.cells = zeros((0, 2), dtype=int64)
+        self.order = zeros(0, dtype=int64)
+        self.sortedKeys = zeros(0, dtype=int64)
+
+    def _keys(self, cells):
+        return (cells[:, 0] + self.CELL_OFFSET) * self.CELL_STRIDE + \
+               (cells[:, 1] + self.CELL_OFFSET)
+
+    """
+        points: n x 2
+    """
+    def build(self, points):
+        self.points = asarray(points)
+        self.cells = floor(self.points / self.cellSize).astype(int64)
+
+        keys = self._keys(self.cells)
+        self.order = argsort(keys, kind='mergesort')
+        self.sortedKeys = keys[self.order]
+
+    """
+        radius: maximum distance, at most cellSize
+        queries: indices of the points to find the neighbours of, all if None
+
+        returns (i, j, dist) arrays of all pairs with i in queries, j != i
+        and dist(i, j) <= radius
+    """
+    def queryPairs(self, radius, queries=None):
+        if radius > self.cellSize:
+            raise ValueError('radius {} is larger than the cell size {}'
+                    .format(radius, self.cellSize))
+
+        if queries is None:
+            queries = arange(self.points.shape[0])
+        queries = asarray(queries, dtype=int64)
+
+        I = []
+        J = []
+        for dx in (-1, 0, 1):
+            for dy in (-1, 0, 1):
+                keys = self._keys(self.cells[queries] + array([dx, dy]))
+
+                # all points in the neighbouring cell are candidates
+                lo = searchsorted(self.sortedKeys, keys, side='left')
+                hi = searchsorted(self.sortedKeys, keys, side='right')
+                counts = hi - lo
+
+                total = counts.sum()
+                if total == 0:
+                    continue
+
+                # concatenate the ranges lo[k]:hi[k]
+                firsts = cumsum(counts) - counts
+                idx = repeat(lo - firsts, counts) + arange(total)
+
+                I.append(repeat(queries, counts))
+                J.append(self.order[idx])
+
+        if len(I) == 0:
+            return (zeros(0, dtype=int64), zeros(0, dtype=int64), zeros(0))
+
+        I = concatenate(I)
+        J = concatenate(J)
+
+        d = self.points[J] - self.points[I]
+        dist = sqrt((d ** 2).sum(axis=1))
+
+        inRange = (dist <= radius) & (I != J)
+
+        return I[inRange], J[inRange], dist[inRange]
@@ -0,0 +1,42 @@
+from collections import OrderedDict
+
+
+class StartStateCache:
+    """
+        Snapshots (see Snapshot) of episode start states, so repeated
+        requests don't have to place and settle the same start formation
+        again. The least recently used snapshots are dropped first.
+
+        maxSize: maximum number of snapshots
+    """
+    def __init__(self, maxSize=256):
+        self.maxSize = maxSize
+        self.snapshots = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self):
+        return len(self.snapshots)
+
+    """
+        returns the snapshot or None
+    """
+    def get(self, key):
+        if key not in self.snapshots:
+            self.misses += 1
+            return None
+
+        self.hits += 1
+        self.snapshots.move_to_end(key)
+        return self.snapshots[key]
+
+    def put(self, key, snapshot):
+        self.snapshots[key] = snapshot
+        self.snapshots.move_to_end(key)
+
+        while len(self.snapshots) > self.maxSize:
+            self.snapshots.popitem(last=False)
+
+    def clear(self):
+        self.snapshots.clear()
@@ -0,0 +1,143 @@
+from numpy import *
+
+from Kilobot import Kilobot
+from DiscPhysics import DiscBody
+
+
+class Swarm:
+    """
+        Array view of a list of kilobots.
+        update() reads the state of all bodies into preallocated buffers
+        (real world units) once per step, so that the swarm can be processed
+        with vectorized operations instead of per-robot calls.
+
+        positions: n x 2
+        angles: n
+        velocities: n x 2 (linear)
+        angularVelocities: n
+
+        scale_real_to_sim: scale factor to go from real world to
+            simulation coords (for numerical reasons)
+    """
+    def __init__(self, kilobots, scale_real_to_sim):
+        self.scale_real_to_sim = scale_real_to_sim
+        self.scale_sim_to_real = 1.0 / scale_real_to_sim
+
+        self.setKilobots(kilobots)
+
+    """
+        has to be called whenever kilobots are added or removed,
+        kilobot.swarm_index is the row of the kilobot in the buffers
+    """
+    def setKilobots(self, kilobots):
+        n = len(kilobots)
+
+        self.kilobots = list(kilobots)
+        self.bodies = [kilobot.body for kilobot in self.kilobots]
+
+        for (i, kilobot) in enumerate(self.kilobots):
+            kilobot.swarm_index = i
+
+        self.positions = zeros((n, 2))
+        self.angles = zeros(n)
+        self.velocities = zeros((n, 2))
+        self.angularVelocities = zeros(n)
+
+        # the bodies of a DiscWorld are read and written as whole arrays
+        self.discWorld = None
+        if n > 0 and isinstance(self.bodies[0], DiscBody):
+            self.discWorld = self.bodies[0].world
+            self.slots = array([body.slot for body in self.bodies])
+
+    def __len__(self):
+        return len(self.bodies)
+
+    def update(self):
+        if len(self.bodies) == 0:
+            return
+
+        s = self.scale_sim_to_real
+
+        if self.discWorld is not None:
+            w = self.discWorld
+            self.positions[:] = w.positions[self.slots] * s
+            self.velocities[:] = w.velocities[self.slots] * s
+            self.angles[:] = w.angles[self.slots]
+            self.angularVelocities[:] = w.angularVelocities[self.slots]
+            return
+
+        # reading the attributes once is faster than indexing the vectors
+        positions = [body.position for body in self.bodies]
+        self.positions[:, 0] = [p.x for p in positions]
+        self.positions[:, 1] = [p.y for p in positions]
+        self.positions *= s
+
+        velocities = [body.linearVelocity for body in self.bodies]
+        self.velocities[:, 0] = [v.x for v in velocities]
+        self.velocities[:, 1] = [v.y for v in velocities]
+        self.velocities *= s
+
+        self.angles[:] = [body.angle for body in self.bodies]
+        self.angularVelocities[:] = [body.angularVelocity
+                                     for body in self.bodies]
+
+    """
+        v: n x 2 linear velocities in real world units
+    """
+    def setLinearVelocities(self, v):
+        v = asarray(v) * self.scale_real_to_sim
+
+        if self.discWorld is not None:
+            self.discWorld.velocities[self.slots] = v
+            return
+
+        for (body, (vx, vy)) in zip(self.bodies, v.tolist()):
+            body.linearVelocity = (vx, vy)
+
+    """
+        returns the motor values (left, right) of all kilobots as uint8
+        arrays
+    """
+    def getMotorValues(self):
+        n = len(self.kilobots)
+        left = fromiter((kb.value_motor_left for kb in self.kilobots),
+                        dtype=uint8, count=n)
+        right = fromiter((kb.value_motor_right for kb in self.kilobots),
+                         dtype=uint8, count=n)
+
+        return left, right
+
+    """
+        left, right: motor values (0 .. 255) of all kilobots
+
+        Kilobot.setVelocities for the whole swarm, the heading is taken from
+        the angles of the last update()
+    """
+    def setMotorVelocities(self, left, right):
+        factorLeft = asarray(left, dtype=uint8) / 255.0
+        factorRight = asarray(right, dtype=uint8) / 255.0
+
+        linear = 0.5 * (factorLeft + factorRight) * \
+                Kilobot.MAX_LINEAR_VELOCITY * self.scale_real_to_sim
+        angular = (factorRight - factorLeft) * Kilobot.MAX_ANGULAR_VELOCITY
+
+        # forward is the local y axis
+        vx = -linear * sin(self.angles)
+        vy = linear * cos(self.angles)
+
+        if self.discWorld is not None:
+            self.discWorld.velocities[self.slots, 0] = vx
+            self.discWorld.velocities[self.slots, 1] = vy
+            self.discWorld.angularVelocities[self.slots] = angular
+            return
+
+        for (body, x, y, w) in zip(self.bodies, vx.tolist(), vy.tolist(),
+                                   angular.tolist()):
+            body.linearVelocity = (x, y)
+            body.angularVelocity = w
+
+    """
+        sets the velocities of all kilobots from their motor values
+    """
+    def setVelocities(self):
+        self.setMotorVelocities(*self.getMotorValues())
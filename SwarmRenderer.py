@@ -0,0 +1,90 @@
+import pygame
+from pygame import draw, gfxdraw
+
+from Kilobot import Kilobot
+
+from numpy import *
+
+
+class SwarmRenderer:
+    """
+        Draws a whole swarm of kilobots with one Surface.blits call.
+        A kilobot sprite is pre-rendered for each of numHeadings quantized
+        headings into one atlas surface, every kilobot is drawn by
+        blitting the sprite of its heading. Kilobots outside of the screen
+        are skipped, the ones on the border are clipped.
+
+        scale_real_to_vis: scale factor to go from real world to
+            visualisation coords (meter to pixels)
+        numHeadings: number of sprites, the heading is rounded to
+            2 pi / numHeadings
+    """
+    def __init__(self, scale_real_to_vis, numHeadings=64,
+            circleColor=Kilobot.CIRCLE_COLOR, lineColor=Kilobot.LINE_COLOR):
+        self.scale_real_to_vis = scale_real_to_vis
+        self.numHeadings = numHeadings
+
+        self.pixelRadius = int(round(scale_real_to_vis * Kilobot.RADIUS))
+
+        # the anti-aliased circle reaches one pixel beyond the radius
+        self.spriteCenter = self.pixelRadius + 1
+        self.spriteSize = 2 * self.spriteCenter + 1
+
+        self.atlas = self._renderAtlas(circleColor, lineColor)
+        self.areas = [pygame.Rect(i * self.spriteSize, 0, self.spriteSize,
+                                  self.spriteSize)
+                      for i in range(numHeadings)]
+
+    def _renderAtlas(self, circleColor, lineColor):
+        size = self.spriteSize
+        c = self.spriteCenter
+        r = self.pixelRadius
+
+        atlas = pygame.Surface((self.numHeadings * size, size),
+                               pygame.SRCALPHA, 32)
+        atlas.fill((0, 0, 0, 0))
+
+        for i in range(self.numHeadings):
+            angle = 2.0 * pi * i / self.numHeadings
+            x = i * size + c
+
+            # forward is the local y axis, the screen y axis points down
+            top = (x - r * sin(angle), c - r * cos(angle))
+
+            gfxdraw.aacircle(atlas, x, c, r, circleColor)
+            draw.aaline(atlas, lineColor, (x, c), top)
+
+        # faster blitting if the display is initialized
+        if pygame.display.get_surface() is not None:
+            atlas = atlas.convert_alpha()
+
+        return atlas
+
+    """
+        positions: n x 2 kilobot positions in real world coords
+        angles: n kilobot angles
+    """
+    def draw(self, screen, positions, angles):
+        if len(positions) == 0:
+            return
+
+        w, h = screen.get_size()
+        s = self.scale_real_to_vis
+        positions = asarray(positions)
+
+        # top left corner of the sprites
+        x = rint(s * positions[:, 0]).astype(int) - self.spriteCenter
+        y = rint(h - s * positions[:, 1]).astype(int) - self.spriteCenter
+
+        visible = (x > -self.spriteSize) & (x < w) & \
+                  (y > -self.spriteSize) & (y < h)
+
+        headings = rint(asarray(angles)[visible] *
+                        (self.numHeadings / (2.0 * pi))).astype(int)
+        headings %= self.numHeadings
+
+        atlas = self.atlas
+        areas = self.areas
+        screen.blits([(atlas, (px, py), areas[k]) for (px, py, k) in
+                      zip(x[visible].tolist(), y[visible].tolist(),
+                          headings.tolist())], doreturn=False)
@@ -0,0 +1,192 @@
+"""
+    Recording of runs to memory-mapped files.
+
+    Every control step the poses of all bodies, the lights and the target
+    position are appended to a binary file:
+
+        bytes 0 - 4095: header
+            magic 'KBTRAJ01', int64 number of steps, int64 values per step,
+            uint32 length of the metadata, metadata as JSON
+            (numBodies, numLights and whatever the simulator adds)
+        then one row of float64 values per step:
+            lights (numLights x 2), target (2, NaN if there is none),
+            bodies (numBodies x 3: x, y, angle), in real world coords
+
+    The file is preallocated and doubled in size whenever it is full, the
+    rows are written through a memory map, so a recording never has to fit
+    into memory. The number of steps in the header is updated after every
+    step, a recording can be read while it is still written (see
+    Trajectory.refresh) and is readable if the simulator is killed.
+"""
+
+import json
+import os
+import struct
+
+from numpy import asarray, empty, float64, memmap, nan, uint8
+
+
+MAGIC = b'KBTRAJ01'
+HEADER_SIZE = 4096
+HEADER_FORMAT = '<8sqqI'
+
+
+class TrajectoryRecorder:
+    """
+        path: file to record to, an existing file is overwritten
+        numBodies: number of bodies per step
+        numLights: number of lights per step
+        meta: dict (JSON serializable) stored with the recording
+        capacity: number of steps the file is preallocated for
+    """
+    def __init__(self, path, numBodies, numLights=1, meta=None,
+            capacity=1024):
+        self.path = path
+        self.numBodies = numBodies
+        self.numLights = numLights
+        self.valuesPerStep = 2 * numLights + 2 + 3 * numBodies
+
+        self.meta = dict(meta or {})
+        self.meta.update(numBodies=numBodies, numLights=numLights)
+        metaBytes = json.dumps(self.meta).encode('utf-8')
+        if struct.calcsize(HEADER_FORMAT) + len(metaBytes) > HEADER_SIZE:
+            raise ValueError('trajectory metadata too large ({} bytes)'
+                    .format(len(metaBytes)))
+
+        self.numSteps = 0
+        self.capacity = 0
+        self.steps = None
+
+        self.file = open(path, 'w+b')
+        self.file.truncate(HEADER_SIZE)
+
+        self.header = memmap(self.file, dtype=uint8, mode='r+',
+                shape=(HEADER_SIZE,))
+        struct.pack_into(HEADER_FORMAT, self.header, 0, MAGIC, 0,
+                self.valuesPerStep, len(metaBytes))
+        start = struct.calcsize(HEADER_FORMAT)
+        self.header[start:start + len(metaBytes)] = bytearray(metaBytes)
+
+        self._grow(max(1, capacity))
+
+    def __len__(self):
+        return self.numSteps
+
+    def _grow(self, capacity):
+        if self.steps is not None:
+            self.steps.flush()
+            self.steps = None
+
+        self.file.truncate(HEADER_SIZE + capacity * self.valuesPerStep *
+                           float64().itemsize)
+        self.steps = memmap(self.file, dtype=float64, mode='r+',
+                offset=HEADER_SIZE, shape=(capacity, self.valuesPerStep))
+        self.capacity = capacity
+
+    """
+        lights: numLights x 2
+        bodies: numBodies x 3 (x, y, angle)
+        target: (x, y) or None
+    """
+    def append(self, lights, bodies, target=None):
+        if self.numSteps == self.capacity:
+            self._grow(2 * self.capacity)
+
+        row = self.steps[self.numSteps]
+        l = 2 * self.numLights
+        row[0:l] = asarray(lights).reshape(-1)
+        row[l:l + 2] = nan if target is None else asarray(target).reshape(-1)
+        row[l + 2:] = asarray(bodies).reshape(-1)
+
+        self.numSteps += 1
+        struct.pack_into('<q', self.header, 8, self.numSteps)
+
+    """
+        writes everything to the file and cuts off the unused capacity,
+        nothing can be appended afterwards
+    """
+    def close(self):
+        if self.file is None:
+            return
+
+        self.steps.flush()
+        self.header.flush()
+        self.steps = None
+        self.header = None
+
+        self.file.truncate(HEADER_SIZE + self.numSteps * self.valuesPerStep *
+                           float64().itemsize)
+        self.file.close()
+        self.file = None
+
+
+class Trajectory:
+    """
+        Read only view of a recording, steps are only read from the file
+        when they are accessed.
+
+        path: file written by a TrajectoryRecorder
+    """
+    def __init__(self, path):
+        self.path = path
+        self.steps = None
+        self.numSteps = 0
+
+        with open(path, 'rb') as f:
+            header = f.read(HEADER_SIZE)
+
+        magic, numSteps, self.valuesPerStep, metaLength = \
+                struct.unpack_from(HEADER_FORMAT, header, 0)
+        if magic != MAGIC:
+            raise ValueError('{} is not a trajectory recording'.format(path))
+
+        start = struct.calcsize(HEADER_FORMAT)
+        self.meta = json.loads(header[start:start + metaLength]
+                               .decode('utf-8'))
+        self.numBodies = self.meta['numBodies']
+        self.numLights = self.meta['numLights']
+
+        self.refresh()
+
+    def __len__(self):
+        return self.numSteps
+
+    """
+        maps the steps which were recorded since the last call
+
+        returns the number of steps
+    """
+    def refresh(self):
+        with open(self.path, 'rb') as f:
+            numSteps, = struct.unpack('<q', f.read(16)[8:16])
+
+        # the file may already be cut off (close) or not be grown yet
+        stepSize = self.valuesPerStep * float64().itemsize
+        numSteps = min(numSteps,
+                (os.path.getsize(self.path) - HEADER_SIZE) // stepSize)
+
+        if numSteps != self.numSteps or self.steps is None:
+            self.numSteps = numSteps
+            self.steps = memmap(self.path, dtype=float64, mode='r',
+                    offset=HEADER_SIZE,
+                    shape=(numSteps, self.valuesPerStep)) \
+                    if numSteps > 0 else empty((0, self.valuesPerStep))
+
+        return self.numSteps
+
+    """
+        returns (lights, target, bodies) of step i, the target is None if
+        none was recorded
+    """
+    def getStep(self, i):
+        row = self.steps[i]
+        l = 2 * self.numLights
+
+        lights = asarray(row[0:l]).reshape(-1, 2)
+        target = asarray(row[l:l + 2])
+        bodies = asarray(row[l + 2:]).reshape(-1, 3)
+
+        if target[0] != target[0]:  # NaN
+            target = None
+
+        return lights, target, bodies
@@ -0,0 +1,160 @@
+"""
+    Offscreen video export of simulation runs.
+
+    A VideoRecorder draws every stride-th simulation step into its own
+    surface, no window is needed. The frames are handed over a bounded
+    queue to a background thread which encodes them:
+
+        path is a directory (no extension): PNG sequence
+            frame000000.png, frame000001.png, ...
+        otherwise: video file written by ffmpeg, the format is taken from
+            the extension (e.g. .mp4, .mkv, .avi, .gif)
+
+    The simulation only waits for the encoder if the queue is full, so no
+    frame is dropped.
+"""
+
+import pygame
+
+import os
+import shutil
+import subprocess
+import threading
+from queue import Queue
+
+
+"""
+    makes pygame use SDL's dummy video driver, so pygame.display works on
+    machines without a display, has to be called before pygame.display is
+    initialized
+"""
+def useDummyVideoDriver():
+    os.environ['SDL_VIDEODRIVER'] = 'dummy'
+
+
+class VideoRecorder:
+    # extensions for which the frames are converted to yuv420p, which is
+    # what most players can show
+    YUV420P_FORMATS = ['.mp4', '.mkv', '.mov']
+
+    """
+        path: directory for a PNG sequence or video file
+        draw: function which draws the scene, called as draw(surface)
+        size: (width, height) of the frames
+        stride: only every stride-th step is recorded
+        fps: frames per second of the video
+        queueSize: maximum number of frames waiting to be encoded
+    """
+    def __init__(self, path, draw, size, stride=1, fps=30, queueSize=32):
+        self.path = path
+        self.draw = draw
+        self.size = (int(size[0]), int(size[1]))
+        self.stride = max(1, stride)
+        self.fps = fps
+
+        self.surface = pygame.Surface(self.size)
+
+        self.numSteps = 0
+        self.numFrames = 0
+
+        self.isSequence = os.path.splitext(path)[1] == ''
+        if self.isSequence:
+            if not os.path.isdir(path):
+                os.makedirs(path)
+            self.ffmpeg = None
+        else:
+            self.ffmpeg = self._startFfmpeg()
+
+        self.queue = Queue(queueSize)
+        self.error = None
+        self.encoder = threading.Thread(target=self._encode)
+        self.encoder.daemon = True
+        self.encoder.start()
+
+    def _startFfmpeg(self):
+        if shutil.which('ffmpeg') is None:
+            raise RuntimeError(('ffmpeg is needed to write \'{}\', use a ' +
+                    'directory for a PNG sequence').format(self.path))
+
+        command = ['ffmpeg', '-y', '-loglevel', 'error',
+                   '-f', 'rawvideo', '-pix_fmt', 'rgb24',
+                   '-s', '{}x{}'.format(*self.size), '-r', str(self.fps),
+                   '-i', '-']
+        if os.path.splitext(self.path)[1].lower() in self.YUV420P_FORMATS:
+            command += ['-pix_fmt', 'yuv420p']
+        command += [self.path]
+
+        return subprocess.Popen(command, stdin=subprocess.PIPE)
+
+    """
+        has to be called after every simulation step
+
+        returns True if the step was recorded
+    """
+    def step(self):
+        self.numSteps += 1
+
+        if self.numSteps % self.stride != 0:
+            return False
+
+        if self.error is not None:
+            raise RuntimeError('encoding \'{}\' failed: {}'.format(
+                    self.path, self.error))
+
+        self.draw(self.surface)
+
+        # a copy of the pixels, the surface is drawn again for the next frame
+        self.queue.put(pygame.image.tostring(self.surface, 'RGB'))
+        self.numFrames += 1
+
+        return True
+
+    def _encode(self):
+        frame = 0
+        while True:
+            data = self.queue.get()
+            if data is None:
+                break
+
+            if self.error is not None:
+                continue
+
+            try:
+                if self.isSequence:
+                    image = pygame.image.fromstring(data, self.size, 'RGB')
+                    pygame.image.save(image, os.path.join(self.path,
+                            'frame{:06d}.png'.format(frame)))
+                else:
+                    self.ffmpeg.stdin.write(data)
+            except Exception as e:
+                # reported by the next step() or close()
+                self.error = e
+
+            frame += 1
+
+    """
+        waits until all frames are encoded
+    """
+    def close(self):
+        if self.encoder is None:
+            return
+
+        self.queue.put(None)
+        self.encoder.join()
+        self.encoder = None
+
+        if self.ffmpeg is not None:
+            self.ffmpeg.stdin.close()
+            if self.ffmpeg.wait() != 0 and self.error is None:
+                self.error = 'ffmpeg exited with {}'.format(
+                        self.ffmpeg.returncode)
+
+        if self.error is not None:
+            raise RuntimeError('encoding \'{}\' failed: {}'.format(
+                    self.path, self.error))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
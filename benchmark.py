@@ -0,0 +1,388 @@
+#!/usr/bin/env python3
+
+"""
+    Throughput benchmark for the simulation hot paths.
+    Runs the single direction pushing scenario and the Labyrinth maze
+    scenario headless for several swarm sizes and both object shapes.
+
+    Reports simulated seconds per wall second, the time spent in each phase
+    of a control step and the peak memory of every run. Each run happens in
+    a fresh process, so the peak memory isn't shared between runs.
+
+    With --backends every run is repeated on each physics engine (see
+    PhysicsBackends).
+
+    The results can be written as JSON (--output) and compared against the
+    results of a previous version (--compare).
+
+    With --profiles the physics profiles are compared instead: the pushing
+    reward of every profile is compared to the one of the 'precise' profile
+    for the same light trajectories, together with the speed of the profile.
+"""
+
+import pygame
+
+from Box2D.b2 import*
+import Box2D
+
+from Labyrinth import Labyrinth
+from PushingWorld import PushingWorld
+from Kilobot import Kilobot
+from PhysicsProfiles import PROFILES, getProfile, DEFAULT_PROFILE
+from PhysicsBackends import BACKENDS, createWorld, DEFAULT_BACKEND
+
+from multiprocessing import Pool
+import argparse
+import platform
+import sys
+import json
+import time
+import math
+
+from numpy import *
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+WIDTH, HEIGHT = 1200, 600
+SCALE_REAL_TO_SIM = 10  # for numerical reasons
+SCALE_REAL_TO_VIS = HEIGHT  # 1m = HEIGHT pixels
+
+SCENARIOS = ['pushing', 'maze']
+PHASES = ['state', 'velocities', 'physics', 'swarmUpdate', 'draw']
+
+
+def peakMemoryMB():
+    if resource is None:
+        return float('nan')
+
+    maxrss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+    # kilobytes on linux, bytes on macOS
+    if platform.system() == 'Darwin':
+        return maxrss / 1024.0 ** 2
+    return maxrss / 1024.0
+
+
+"""
+    runs one scenario in the current process
+
+    returns a dict with the results
+"""
+def runScenario(scenario, numKilobots, objectShape, numSteps, draw,
+        profileName=DEFAULT_PROFILE, backend=DEFAULT_BACKEND):
+    w = createWorld(backend)
+
+    maze = None
+    if scenario == 'maze':
+        maze = Labyrinth(w, SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS)
+
+    pushingWorld = PushingWorld(w, SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS,
+            numKilobots, objectShape)
+    pushingWorld.setProfile(getProfile(profileName))
+
+    r = Kilobot.RADIUS
+    kilobotOffsets = array([[-r, -r], [r, -r], [-r, r], [r, r]])
+    HALF_W = pushingWorld.pushObject.HALF_W
+
+    # same start configurations as the simulate scripts
+    if scenario == 'maze':
+        objStart = [1.25, 0.75]
+        pushingWorld.reset(objStart, objStart, kilobotOffsets,
+                kilobotStart=[objStart[0] - 2.0 * HALF_W, objStart[1]])
+    else:
+        objStart = [1.0, 0.5]
+        pushingWorld.reset(objStart, [objStart[0] - 1.5 * HALF_W,
+                objStart[1]], kilobotOffsets)
+
+    # the light moves with constant speed to the right
+    a = matrix([0.01, 0.0])
+
+    screen = None
+    if draw:
+        screen = pygame.Surface((WIDTH, HEIGHT))
+
+    timings = dict((phase, 0.0) for phase in PHASES)
+
+    start = time.time()
+    for step in range(numSteps):
+        t0 = time.time()
+        s = pushingWorld.getState()
+        pushingWorld.moveLight(a)
+
+        t1 = time.time()
+        pushingWorld.moveTowardLight()
+
+        t2 = time.time()
+        pushingWorld.stepPhysics()
+
+        t3 = time.time()
+        pushingWorld.swarm.update()
+
+        t4 = time.time()
+        if screen is not None:
+            screen.fill((0, 0, 0, 0))
+            if maze is not None:
+                maze.draw(screen)
+            pushingWorld.draw(screen)
+
+        t5 = time.time()
+
+        timings['state'] += t1 - t0
+        timings['velocities'] += t2 - t1
+        timings['physics'] += t3 - t2
+        timings['swarmUpdate'] += t4 - t3
+        timings['draw'] += t5 - t4
+    wallTime = time.time() - start
+
+    simTime = numSteps * pushingWorld.profile.getControlStepTime()
+
+    return {'scenario': scenario,
+            'numKilobots': numKilobots,
+            'objectShape': objectShape,
+            'physicsProfile': profileName,
+            'physicsBackend': backend,
+            'numSteps': numSteps,
+            'simSeconds': simTime,
+            'wallSeconds': wallTime,
+            'simSecondsPerWallSecond': simTime / wallTime,
+            'phaseSeconds': timings,
+            'peakMemoryMB': peakMemoryMB()}
+
+
+def _runScenario(args):
+    return runScenario(*args)
+
+
+"""
+    runs the episodes of a getSamples request (light moving to the right)
+    with every physics profile
+
+    returns a dict with the rewards and the speed of every profile and
+    their errors compared to the 'precise' profile
+"""
+def runProfileComparison(numKilobots, objectShape, numEpisodes, numSteps):
+    r = Kilobot.RADIUS
+    kilobotOffsets = array([[-r, -r], [r, -r], [-r, r], [r, r]])
+
+    # start positions as in simulate_single_direction.py
+    objStart = array([1.0, 0.5])
+    angles = linspace(0, 2 * math.pi, numEpisodes + 1)[0:numEpisodes]
+    startPositions = c_[objStart[0] + cos(angles) * 1.5 * 0.075,
+                        objStart[1] + sin(angles) * 1.5 * 0.075]
+
+    a = matrix([0.01, 0.0])
+
+    rewards = {}
+    wallTimes = {}
+    for name in sorted(PROFILES.keys()):
+        pushingWorld = PushingWorld(world(gravity=(0, 0), doSleep=True),
+                SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS, numKilobots, objectShape)
+        pushingWorld.setProfile(getProfile(name))
+
+        R = empty((numEpisodes, numSteps))
+
+        start = time.time()
+        for ep in range(numEpisodes):
+            pushingWorld.reset(objStart, startPositions[ep, :],
+                    kilobotOffsets)
+
+            for step in range(numSteps):
+                objPosOld = pushingWorld.pushObject.getRealPosition()
+
+                pushingWorld.moveLight(a)
+                pushingWorld.step()
+
+                # reward of simulate_single_direction.py
+                objMovement = pushingWorld.pushObject.getRealPosition() -\
+                        objPosOld
+                R[ep, step] = objMovement[0, 0] - \
+                        0.5 * abs(objMovement[0, 1])
+        wallTimes[name] = time.time() - start
+
+        rewards[name] = R
+
+    ref = rewards[DEFAULT_PROFILE]
+    refReturns = ref.sum(axis=1)
+
+    profiles = {}
+    for name in rewards:
+        returns = rewards[name].sum(axis=1)
+
+        profiles[name] = {
+            'meanReturn': returns.mean(),
+            # mean absolute error of the return of an episode
+            'returnError': abs(returns - refReturns).mean(),
+            'relativeReturnError': abs(returns - refReturns).mean() /
+                    abs(refReturns).mean(),
+            # mean absolute error of a single reward
+            'rewardError': abs(rewards[name] - ref).mean(),
+            'simSecondsPerWallSecond': numEpisodes * numSteps *
+                    getProfile(name).getControlStepTime() / wallTimes[name],
+            'speedup': wallTimes[DEFAULT_PROFILE] / wallTimes[name]}
+
+    return {'numKilobots': numKilobots,
+            'objectShape': objectShape,
+            'numEpisodes': numEpisodes,
+            'numSteps': numSteps,
+            'profiles': profiles}
+
+
+def _runProfileComparison(args):
+    return runProfileComparison(*args)
+
+
+def printProfileComparison(res):
+    print('{} kilobots, {} object, {} episodes x {} steps'.format(
+        res['numKilobots'], res['objectShape'], res['numEpisodes'],
+        res['numSteps']))
+    print('{:>13} {:>10} {:>13} {:>13} {:>10} {:>8}'.format('profile',
+        'return', 'return error', 'reward error', 'sim/wall', 'speedup'))
+
+    for name in sorted(res['profiles'].keys()):
+        p = res['profiles'][name]
+        print('{:>13} {:>10.4f} {:>6.4f} ({:>3.0%}) {:>13.2e} {:>10.2f} {:>7.2f}x'
+              .format(name, p['meanReturn'], p['returnError'],
+                      p['relativeReturnError'], p['rewardError'],
+                      p['simSecondsPerWallSecond'], p['speedup']))
+
+
+def printHeader():
+    print(('{:>8} {:>6} {:>7} {:>7} {:>10} ' +
+           ' '.join(['{:>11}'] * len(PHASES)) + ' {:>9}').format(
+               'scenario', 'n', 'shape', 'backend', 'sim/wall',
+               *(PHASES + ['peak MB'])))
+
+
+"""
+    phase timings are printed per control step
+"""
+def printResult(res):
+    phases = [res['phaseSeconds'][p] / res['numSteps'] * 1000.0
+              for p in PHASES]
+    print(('{:>8} {:>6} {:>7} {:>7} {:>10.2f} ' +
+           ' '.join(['{:>9.3f}ms'] * len(PHASES)) + ' {:>9.1f}').format(
+               res['scenario'], res['numKilobots'], res['objectShape'],
+               res.get('physicsBackend', DEFAULT_BACKEND),
+               res['simSecondsPerWallSecond'],
+               *(phases + [res['peakMemoryMB']])))
+
+
+"""
+    prints the runs which are more than threshold (relative) slower than in
+    the old results
+
+    returns the number of regressions
+"""
+def compareResults(results, oldResults, threshold):
+    def key(res):
+        return (res['scenario'], res['numKilobots'], res['objectShape'],
+                res.get('physicsProfile', DEFAULT_PROFILE),
+                res.get('physicsBackend', DEFAULT_BACKEND))
+
+    old = dict((key(res), res) for res in oldResults)
+
+    numRegressions = 0
+    for res in results:
+        if key(res) not in old:
+            continue
+
+        oldSpeed = old[key(res)]['simSecondsPerWallSecond']
+        speed = res['simSecondsPerWallSecond']
+
+        change = speed / oldSpeed - 1.0
+        if change < -threshold:
+            numRegressions += 1
+            print('regression: {} {} {}: {:.2f} -> {:.2f} sim/wall ({:+.0%})'
+                  .format(res['scenario'], res['numKilobots'],
+                          res['objectShape'], oldSpeed, speed, change))
+
+    return numRegressions
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(
+            description='benchmark the simulation throughput')
+    parser.add_argument('--scenarios', nargs='+', default=SCENARIOS,
+            choices=SCENARIOS)
+    parser.add_argument('--kilobots', nargs='+', type=int,
+            default=[10, 100, 1000])
+    parser.add_argument('--shapes', nargs='+', default=['quad', 'circle'],
+            choices=['quad', 'circle'])
+    parser.add_argument('--steps', type=int, default=50,
+            help='control steps per run')
+    parser.add_argument('--profile', default=DEFAULT_PROFILE,
+            choices=sorted(PROFILES.keys()),
+            help='physics profile of the throughput runs')
+    parser.add_argument('--backends', nargs='+', default=[DEFAULT_BACKEND],
+            choices=BACKENDS,
+            help='physics engines of the throughput runs')
+    parser.add_argument('--profiles', action='store_true',
+            help='compare the accuracy and speed of the physics profiles')
+    parser.add_argument('--episodes', type=int, default=8,
+            help='episodes per profile comparison')
+    parser.add_argument('--no-draw', action='store_true',
+            help='don\'t measure drawing to an offscreen surface')
+    parser.add_argument('--output', help='write the results as JSON')
+    parser.add_argument('--compare',
+            help='JSON results of a previous version to compare against')
+    parser.add_argument('--threshold', type=float, default=0.1,
+            help='relative slowdown which counts as regression')
+    args = parser.parse_args()
+
+    if args.profiles:
+        runs = [(n, shape, args.episodes, args.steps)
+                for n in args.kilobots
+                for shape in args.shapes]
+
+        pool = Pool(1, maxtasksperchild=1)
+        results = []
+        for res in pool.imap(_runProfileComparison, runs):
+            results.append(res)
+            printProfileComparison(res)
+            print('')
+        pool.close()
+
+        if args.output is not None:
+            with open(args.output, 'w') as f:
+                json.dump({'python': platform.python_version(),
+                           'box2d': Box2D.__version__,
+                           'platform': platform.platform(),
+                           'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                           'profileComparisons': results}, f, indent=2)
+
+        sys.exit(0)
+
+    runs = [(scenario, n, shape, args.steps, not args.no_draw, args.profile,
+             backend)
+            for scenario in args.scenarios
+            for n in args.kilobots
+            for shape in args.shapes
+            for backend in args.backends]
+
+    # a fresh process for every run to measure its peak memory
+    pool = Pool(1, maxtasksperchild=1)
+    results = []
+    printHeader()
+    for res in pool.imap(_runScenario, runs):
+        results.append(res)
+        printResult(res)
+    pool.close()
+
+    if args.output is not None:
+        with open(args.output, 'w') as f:
+            json.dump({'python': platform.python_version(),
+                       'box2d': Box2D.__version__,
+                       'platform': platform.platform(),
+                       'time': time.strftime('%Y-%m-%d %H:%M:%S'),
+                       'results': results}, f, indent=2)
+
+    if args.compare is not None:
+        with open(args.compare) as f:
+            oldResults = json.load(f)['results']
+
+        if compareResults(results, oldResults, args.threshold) > 0:
+            sys.exit(1)
@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 
 """
     This demonstrates how to use the simulator.
@@ -9,7 +9,7 @@
 # for visualization
 import pygame
 from pygame.locals import *
-from pygame import draw, gfxdraw
+from pygame import gfxdraw
 
 # Box2D handles the physics
 import Box2D
@@ -19,29 +19,83 @@ from Box2D.b2 import*
 from Labyrinth import Labyrinth
 from Object import Object
 from Phototaxisbot import Phototaxisbot
+from Swarm import Swarm
+from SwarmRenderer import SwarmRenderer
+from IRCommunication import IRCommunication
+from LightField import LightField
+from PhysicsProfiles import PROFILES, getProfile, DEFAULT_PROFILE
+from PhysicsBackends import BACKENDS, createWorld, DEFAULT_BACKEND
+from Renderer import Renderer
+from Snapshot import takeSnapshot, restoreSnapshot
+from Trajectory import TrajectoryRecorder
+from VideoExport import VideoRecorder, useDummyVideoDriver
 
-import random
+import argparse
 import math
 import time
-from numpy import array
+from numpy import array, empty
+from numpy.random import RandomState
 
 
+parser = argparse.ArgumentParser()
+parser.add_argument('--profile', default=DEFAULT_PROFILE,
+        choices=sorted(PROFILES.keys()),
+        help='physics profile (solver iterations and sleeping)')
+parser.add_argument('--backend', default=DEFAULT_BACKEND, choices=BACKENDS,
+        help='physics engine')
+parser.add_argument('--fps', type=int, default=60,
+        help='maximum frames per second, the simulation isn\'t limited')
+parser.add_argument('--frame-skip', type=int, default=1,
+        help='only draw every k-th simulation step')
+parser.add_argument('--falloff', default='linear',
+        choices=LightField.FALLOFFS,
+        help='how the light intensity falls off with the distance')
+parser.add_argument('--light-noise', type=float, default=0.0,
+        help='standard deviation of the light sensor noise')
+parser.add_argument('--occlusion', action='store_true',
+        help='the walls of the labyrinth cast shadows')
+parser.add_argument('--seed', type=int, default=None,
+        help='seed of the start positions and the sensor noise')
+parser.add_argument('--record', default=None, metavar='PATH',
+        help='record every simulation step to PATH, see replay.py')
+parser.add_argument('--video', default=None, metavar='PATH',
+        help='write the run to a video file or a PNG directory, see ' +
+             'VideoExport')
+parser.add_argument('--video-stride', type=int, default=1,
+        help='only every k-th simulation step is written to the video')
+parser.add_argument('--video-fps', type=int, default=30,
+        help='frames per second of the video')
+parser.add_argument('--offscreen', action='store_true',
+        help='no window (SDL dummy video driver), for headless machines')
+parser.add_argument('--steps', type=int, default=None,
+        help='stop after this many simulation steps')
+args = parser.parse_args()
+
+profile = getProfile(args.profile)
+
+# all randomness of the simulation comes from here
+rng = RandomState(args.seed)
+
 WIDTH, HEIGHT = 1200, 600
 SCALE_REAL_TO_SIM = 10  # for numerical reasons
 SCALE_REAL_TO_VIS = HEIGHT  # 1m = HEIGHT pixels
 
 # initialize pygame window
+if args.offscreen:
+    useDummyVideoDriver()
 screen = pygame.display.set_mode((WIDTH, HEIGHT), HWSURFACE | DOUBLEBUF, 32)
 pygame.display.set_caption('kbsim - 0.0s')
 
 clock = pygame.time.Clock()
 
-# create Box2D physics world
-world = world(gravity=(0, 0), doSleep=True)
+# create the physics world (Box2D or DiscPhysics)
+world = createWorld(args.backend)
+profile.apply(world)
 
 # add the labyrinth and object to the world
 labyrinth = Labyrinth(world, SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS)
-push_object = Object(world, SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS, (1.25, 0.75))
+push_object = Object(world, SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS, (1.25, 0.75),
+                     'quad')
 
 # environment
 env = {'light_pos': array([1.75, 0.75]).reshape(1, 2)}
@@ -49,72 +103,154 @@ env = {'light_pos': array([1.75, 0.75]).reshape(1, 2)}
 # add some kilobots with Phototaxis behavior
 kilobots = []
 for i in range(100):
-    x = random.random() * 0.5 + 1.0
-    y = random.random() * 0.5 + 0.5
+    x = rng.random_sample() * 0.5 + 1.0
+    y = rng.random_sample() * 0.5 + 0.5
     kilobots += [Phototaxisbot(world, SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS,
                                 (x, y), env)]
 
+# kilobots can talk to their neighbours (Kilobot.broadcast)
+swarm = Swarm(kilobots, SCALE_REAL_TO_SIM)
+communication = IRCommunication(swarm)
+
+# the light sensor readings of all kilobots, light 0 follows env['light_pos']
+light_field = LightField(swarm, falloff=args.falloff, noise=args.light_noise,
+                         labyrinth=labyrinth if args.occlusion else None,
+                         rng=rng)
+light_field.addLight(env['light_pos'])
+env['light_field'] = light_field
+
+# draws all kilobots at once
+swarm_renderer = SwarmRenderer(SCALE_REAL_TO_VIS)
+
+# poses of the object and the kilobots, the lights
+recorder = None
+if args.record is not None:
+    recorder = TrajectoryRecorder(args.record, 1 + len(kilobots),
+            numLights=len(light_field.lights),
+            meta={'labyrinth': True, 'objectShape': 'quad',
+                  'numKilobots': len(kilobots)})
+    poses = empty((1 + len(kilobots), 3))
+
+
+def draw_scene(screen):
+    # draw labyrinth and object
+    screen.fill((0, 0, 0, 0))
+    labyrinth.draw(screen)
+    push_object.draw(screen)
+
+    # draw lights
+    for light_pos in light_field.lights:
+        lx = int(SCALE_REAL_TO_VIS * light_pos[0])
+        ly = int(screen.get_height() - SCALE_REAL_TO_VIS * light_pos[1])
+        gfxdraw.aacircle(screen, lx, ly, 5, (255, 255, 0, 255))
+
+    # kilobot poses of the last swarm.update()
+    swarm_renderer.draw(screen, swarm.positions, swarm.angles)
+
+    pygame.display.set_caption('kbsim - {:.2f}s - ts: {:.0f}ms'.
+            format(curr_time, time_step * 1000))
+
+# drawing runs at its own frame rate, independent of the simulation
+renderer = None
+if not args.offscreen:
+    renderer = Renderer(screen, draw_scene, maxFps=args.fps,
+                        frameSkip=args.frame_skip)
+
+# every k-th step is drawn offscreen and encoded in the background
+video = None
+if args.video is not None:
+    video = VideoRecorder(args.video, draw_scene, (WIDTH, HEIGHT),
+            stride=args.video_stride, fps=args.video_fps)
 
 # main loop
 running = True
 paused = False
 curr_time = 0
 time_step = 0.1
+num_steps = 0
 
-while running:
-    light_pos = env['light_pos']
-
-    # event queue
-    for event in pygame.event.get():
-        if event.type == QUIT or \
-                (event.type == KEYDOWN and event.key == K_ESCAPE):
-            running = False
-        elif event.type == KEYDOWN:
-            if event.key == K_UP:
-                light_pos[0, 1] += 0.1
-            elif event.key == K_RIGHT:
-                light_pos[0, 0] += 0.1
-            elif event.key == K_DOWN:
-                light_pos[0, 1] -= 0.1
-            elif event.key == K_LEFT:
-                light_pos[0, 0] -= 0.1
-            elif event.key == K_SPACE:
-                paused = not paused
-            elif event.key == K_PLUS:
-                time_step = time_step + 0.01
-            elif event.key == K_MINUS:
-                time_step = time_step - 0.01
-
-    env['light_pos'] = light_pos
+# 's' saves the simulation, 'r' goes back to it
+snapshot = None
+snapshot_time = 0
 
-    # draw labyrinth and object
-    screen.fill((0, 0, 0, 0))
-    labyrinth.draw(screen)
-    push_object.draw(screen)
+# the recordings are finished also if a step fails
+try:
+    while running:
+        light_pos = env['light_pos']
+
+        # event queue
+        for event in pygame.event.get():
+            if event.type == QUIT or \
+                    (event.type == KEYDOWN and event.key == K_ESCAPE):
+                running = False
+            elif event.type == KEYDOWN:
+                if event.key == K_UP:
+                    light_pos[0, 1] += 0.1
+                elif event.key == K_RIGHT:
+                    light_pos[0, 0] += 0.1
+                elif event.key == K_DOWN:
+                    light_pos[0, 1] -= 0.1
+                elif event.key == K_LEFT:
+                    light_pos[0, 0] -= 0.1
+                elif event.key == K_SPACE:
+                    paused = not paused
+                elif event.key == K_PLUS:
+                    time_step = time_step + 0.01
+                elif event.key == K_MINUS:
+                    time_step = time_step - 0.01
+                elif event.key == K_s:
+                    snapshot = takeSnapshot([push_object.body] + swarm.bodies,
+                            kilobots, light_field.lights, rng)
+                    snapshot_time = curr_time
+                elif event.key == K_r and snapshot is not None:
+                    light_field.lights = restoreSnapshot(snapshot,
+                            [push_object.body] + swarm.bodies, kilobots, rng)
+                    light_pos[:] = light_field.lights[0:1]
+                    curr_time = snapshot_time
+
+        env['light_pos'] = light_pos
+        light_field.setLightPosition(0, light_pos)
+
+        # deliver messages and read the light sensors
+        swarm.update()
+        communication.step()
+        light_field.update()
+
+        if recorder is not None and not paused:
+            poses[0, 0:2] = push_object.getRealPosition()
+            poses[0, 2] = push_object.body.angle
+            poses[1:, 0:2] = swarm.positions
+            poses[1:, 2] = swarm.angles
+            recorder.append(light_field.lights, poses)
+
+        # handle kilobot movement, the motor values of all kilobots are turned
+        # into velocities at once
+        for kb in kilobots:
+            kb.step()
+        swarm.setVelocities()
 
-    # draw light
-    light_pos = env['light_pos']
-    lx = int(SCALE_REAL_TO_VIS * light_pos[0, 0])
-    ly = int(screen.get_height() - SCALE_REAL_TO_VIS * light_pos[0, 1])
-    gfxdraw.aacircle(screen, lx, ly, 5, (255, 255, 0, 255))
+        if not paused:
+            # the time step is controlled by the user, the solver iterations by
+            # the physics profile
+            world.Step(time_step, profile.velocityIterations,
+                    profile.positionIterations)
 
-    # handle kilobot movement and drawing
-    for kb in kilobots:
-        kb.step()
-        kb.setVelocities()
-        kb.draw(screen)
+            curr_time = curr_time + time_step
+            num_steps += 1
 
-    if not paused:
-        # step physics objects using 10 pos and vel update iterations
-        world.Step(time_step, 10, 10)
+            if video is not None:
+                video.step()
 
-        curr_time = curr_time + time_step
-        pygame.display.set_caption('kbsim - {:.2f}s - ts: {:.0f}ms'.
-                format(curr_time, time_step * 1000))
+            if args.steps is not None and num_steps >= args.steps:
+                running = False
 
-    pygame.display.flip()
+        if renderer is not None:
+            renderer.step()
+finally:
+    if recorder is not None:
+        recorder.close()
 
-    # limit speed (wait to get 60 updates/sec)
-    #clock.tick(60)
+    if video is not None:
+        video.close()
 
 pygame.quit()
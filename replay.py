@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+
+"""
+    Plays back a recording (see Trajectory) without simulating anything.
+    The bodies are only placed where they were recorded, so any step can
+    be shown immediately, however long the recording is.
+
+    space: play / pause
+    left / right: one step back / forward
+    down / up: 100 steps back / forward
+    home / end: first / last step
+    + / -: play faster / slower
+
+    While playing at the end of the recording, steps the simulator records
+    meanwhile are picked up.
+"""
+
+import pygame
+from pygame.locals import *
+from pygame import gfxdraw
+
+from Labyrinth import Labyrinth
+from Object import Object
+from SwarmRenderer import SwarmRenderer
+from PhysicsBackends import createWorld
+from Trajectory import Trajectory
+
+from Box2D.b2 import vec2
+
+import argparse
+
+
+parser = argparse.ArgumentParser()
+parser.add_argument('path', help='recording written by TrajectoryRecorder')
+parser.add_argument('--fps', type=int, default=30,
+        help='steps per second when playing')
+parser.add_argument('--start', type=int, default=0,
+        help='step to start at')
+args = parser.parse_args()
+
+trajectory = Trajectory(args.path)
+meta = trajectory.meta
+
+WIDTH, HEIGHT = 1200, 600
+SCALE_REAL_TO_SIM = 10
+SCALE_REAL_TO_VIS = HEIGHT  # 1m = HEIGHT pixels
+
+screen = pygame.display.set_mode((WIDTH, HEIGHT), HWSURFACE | DOUBLEBUF, 32)
+clock = pygame.time.Clock()
+
+# the bodies are only used for drawing, the world is never stepped
+world = createWorld()
+
+labyrinth = None
+if meta.get('labyrinth', False):
+    labyrinth = Labyrinth(world, SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS)
+
+push_object = Object(world, SCALE_REAL_TO_SIM, SCALE_REAL_TO_VIS, (0, 0),
+                     meta.get('objectShape', 'quad'))
+
+# the kilobots are drawn directly from the recorded poses
+swarm_renderer = SwarmRenderer(SCALE_REAL_TO_VIS)
+
+
+def draw(screen, step):
+    lights, target, poses = trajectory.getStep(step)
+
+    x, y, angle = poses[0]
+    push_object.body.position = vec2(x, y) * SCALE_REAL_TO_SIM
+    push_object.body.angle = angle
+
+    screen.fill((0, 0, 0, 0))
+    if labyrinth is not None:
+        labyrinth.draw(screen)
+    push_object.draw(screen)
+
+    swarm_renderer.draw(screen, poses[1:, 0:2], poses[1:, 2])
+
+    h = screen.get_height()
+    for (lx, ly) in lights:
+        gfxdraw.aacircle(screen, int(SCALE_REAL_TO_VIS * lx),
+                int(h - SCALE_REAL_TO_VIS * ly), 5, (255, 255, 0, 255))
+
+    # line from object to target position
+    if target is not None:
+        ox, oy = poses[0, 0:2]
+        pygame.draw.aaline(screen, (0, 0, 255),
+                (int(SCALE_REAL_TO_VIS * ox), int(h - SCALE_REAL_TO_VIS * oy)),
+                (int(SCALE_REAL_TO_VIS * target[0]),
+                 int(h - SCALE_REAL_TO_VIS * target[1])))
+
+    pygame.display.set_caption('kbsim replay - step {} / {}'.format(
+            step, len(trajectory)))
+
+
+running = True
+playing = False
+fps = args.fps
+step = args.start
+shown = None
+
+while running:
+    for event in pygame.event.get():
+        if event.type == QUIT or \
+                (event.type == KEYDOWN and event.key == K_ESCAPE):
+            running = False
+        elif event.type == KEYDOWN:
+            if event.key == K_SPACE:
+                playing = not playing
+            elif event.key == K_RIGHT:
+                step += 1
+            elif event.key == K_LEFT:
+                step -= 1
+            elif event.key == K_UP:
+                step += 100
+            elif event.key == K_DOWN:
+                step -= 100
+            elif event.key == K_HOME:
+                step = 0
+            elif event.key == K_END:
+                trajectory.refresh()
+                step = len(trajectory) - 1
+            elif event.key == K_PLUS:
+                fps *= 2
+            elif event.key == K_MINUS:
+                fps = max(1, fps // 2)
+
+    if playing:
+        step += 1
+        if step >= len(trajectory):
+            trajectory.refresh()
+
+    step = max(0, min(step, len(trajectory) - 1))
+
+    if step != shown and len(trajectory) > 0:
+        draw(screen, step)
+        pygame.display.flip()
+        shown = step
+
+    clock.tick(fps if playing else 30)
+
+pygame.quit()
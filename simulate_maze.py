@@ -1,10 +1,40 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 
 """
     Multiple Kilobots move directly to the light in order to solve a maze.
     The light is moved based on two policies.
     One policy moves the object only to the right (objPolicy) and the other
     policy gives the position to move to for solving the maze (mazePolicy).
+
+    A 'testMaze' request with 'numTrials' runs that many trials of at most
+    'maxSteps' control steps and answers with a 'testMazeResults' message:
+
+        trials: one dict per trial
+            success: the object reached the goal region of the Labyrinth
+            stepsToGoal, timeToGoal: control steps / simulated seconds until
+                the goal was reached (None if it wasn't)
+            numSteps: control steps of the trial
+            pathLength: distance the object travelled (m)
+            collisions: how often the object hit a wall
+            remainingDistance: distance of the object to the goal along the
+                maze at the end of the trial (m, see NavigationField)
+        successRate, meanTimeToGoal (over the successful trials),
+        meanPathLength, meanCollisions, meanRemainingDistance
+
+    Trials differ by a random displacement of the kilobot start positions
+    ('startNoise' m, seeded with 'seed') and, if 'useMean' is False, by
+    sampled actions. With --workers the trials run in parallel.
+    Without 'numTrials' the policies are shown until the simulator is
+    stopped.
+
+    With 'videoPath' every trial is drawn offscreen (no window needed) and
+    written to a video file or PNG sequence, every 'videoStride'-th step at
+    'videoFps' (see VideoExport). With 'recordPath' every trial is
+    recorded (see Trajectory and replay.py). With several trials the trial
+    index is added to these paths, or replaces '{trial}' in them.
+
+    With 'navigationField': True the maze policy is the NavigationField of
+    the Labyrinth (a baseline which needs no mazePolicyModule).
 """
 
 import pygame
@@ -18,12 +48,21 @@ from Box2D.b2 import*
 from Object import Object
 from Kilobot import Kilobot
 from Labyrinth import Labyrinth
+from PushingWorld import PushingWorld
+from PhysicsProfiles import getProfile, DEFAULT_PROFILE
+from PhysicsBackends import createWorld, DEFAULT_BACKEND
+from Renderer import Renderer
+from Trajectory import TrajectoryRecorder
+from NavigationField import NavigationField
+from VideoExport import VideoRecorder
+from PolicyModules import PolicyModuleCache
 
-import random
+import argparse
 
 from zmq import Context, PAIR
 import pickle
-import importlib
+import os
+from multiprocessing import Pool
 
 from numpy import *
 import numpy as np
@@ -37,188 +76,521 @@ class KilobotsObjectMazeSimulator:
 
     ZMQ_PORT = 2358
 
-    def __init__(self):
-        # pygame
+    # default maximum displacement of the kilobot start positions of a trial
+    START_NOISE = 0.005  # meters
+
+    # the object hits a wall when its outline gets this close to it, the
+    # next hit is counted after it moved RELEASE_DISTANCE away again
+    COLLISION_DISTANCE = 0.002  # meters
+    RELEASE_DISTANCE = 0.01  # meters
+
+    """
+        headless: default for requests which don't specify 'headless',
+            if True pygame is never initialized and there is no frame pacing
+        numWorkers: if > 1 the trials of a request are split across a pool
+            of worker processes (always headless)
+    """
+    def __init__(self, headless=False, numWorkers=1):
+        self.headless = headless
+
+        # worker processes are forked before pygame is initialized
+        self.numWorkers = numWorkers
+        self.pool = None
+        if numWorkers > 1:
+            self.pool = Pool(numWorkers, _initWorker)
+
+        # pygame (created lazily if started headless)
+        self.screen = None
+        if not self.headless:
+            self._initDisplay()
+
+        # physics world with the maze, kilobots and object, kept across
+        # requests with the same physics backend
+        self.physicsBackend = None
+        self.world = None
+        self.maze = None
+        self.pushingWorld = None
+
+        # created when it is needed first (see _getNavigationField)
+        self.navigationField = None
+
+        # policy modules are loaded in memory (see PolicyModules)
+        self.policyModules = PolicyModuleCache()
+
+    def _initDisplay(self):
         self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT),
                 HWSURFACE | DOUBLEBUF, 32)
         pygame.display.set_caption('kbsim')
         self.clock = pygame.time.Clock()
 
-        # pybox2d
-        self.world = world(gravity=(0, 0), doSleep=True)
-
-        self.maze = Labyrinth(self.world, self.SCALE_REAL_TO_SIM, self.SCALE_REAL_TO_VIS)
-
+    def run(self):
         # zqm
         context = Context()
         self.socket = context.socket(PAIR)
         self.socket.connect('tcp://localhost:{}'.format(self.ZMQ_PORT))
 
-    def run(self):
         while True:
             msg = pickle.loads(self.socket.recv())
 
             if msg['message'] == 'sentPolicyModules':
-                for fileName, source in msg['modules']:
-                    with open(fileName, 'w') as f:
-                        f.write(source)
-                objPolicyModule = importlib.import_module(msg['objPolicyModule'])
-                mazePolicyModule = importlib.import_module(msg['mazePolicyModule'])
+                # only loaded again if the sources changed
+                self.policyModules.update(msg['modules'])
+                policyModuleSources = msg['modules']
+                objPolicyModuleName = msg['objPolicyModule']
+                mazePolicyModuleName = msg.get('mazePolicyModule', None)
+                objPolicyModule = self.policyModules.get(objPolicyModuleName)
+                mazePolicyModule = None
+                if mazePolicyModuleName is not None:
+                    mazePolicyModule = self.policyModules.get(
+                            mazePolicyModuleName)
+            elif msg['message'] == 'testMaze' and 'numTrials' in msg:
+                if self.pool is not None:
+                    trials = self._runTrialsInPool(msg, policyModuleSources,
+                            objPolicyModuleName, mazePolicyModuleName)
+                else:
+                    self._readRequest(msg, objPolicyModule, mazePolicyModule)
+
+                    if not self.headlessRequest and self.screen is None:
+                        self._initDisplay()
+
+                    trials = self._runTrials(range(self.numTrials))
+
+                results = summarizeTrials(trials)
+                results['message'] = 'testMazeResults'
+                self.socket.send(pickle.dumps(results, protocol=2))
             elif msg['message'] == 'testMaze':
-                # load the object policy
-                objPolicyDict = msg['objPolicyDict']
-                self.objPolicy = objPolicyModule.fromSerializableDict(objPolicyDict)
-
-                # load the maze policy
-                mazePolicyDict = msg['mazePolicyDict']
-                self.mazePolicy = mazePolicyModule.fromSerializableDict(mazePolicyDict)
+                self._readRequest(msg, objPolicyModule, mazePolicyModule)
 
-                # read parameters
-                self.objectShape = msg['objectShape']
-                self.numKilobots = msg['numKilobots']
-                self.stepsPerSec = msg['stepsPerSec']
+                if self.screen is None:
+                    self._initDisplay()
 
                 self._testMazePolicy()
             else:
                 print('got unexpected message')
 
-    def _testMazePolicy(self):
-        # create kilobots
-        self.kilobots = []
-        for i in range(self.numKilobots):
-            kilobot = Kilobot(self.world, self.SCALE_REAL_TO_SIM,
-                self.SCALE_REAL_TO_VIS, [0, 0])
-            kilobot.fixture.friction = 20
-
-            self.kilobots += [kilobot]
-
-        self.pushObject = Object(self.world, self.SCALE_REAL_TO_SIM,
-                self.SCALE_REAL_TO_VIS, [0, 0], self.objectShape)
+    def _readRequest(self, msg, objPolicyModule, mazePolicyModule):
+        # policies are loaded again for every trial (see _loadPolicies)
+        self.objPolicyModule = objPolicyModule
+        self.objPolicyDict = msg['objPolicyDict']
+        self.mazePolicyModule = mazePolicyModule
+        self.mazePolicyDict = msg.get('mazePolicyDict', None)
+        self.useNavigationField = msg.get('navigationField', False)
+
+        # read parameters
+        self.objectShape = msg['objectShape']
+        self.numKilobots = msg['numKilobots']
+        self.stepsPerSec = msg['stepsPerSec']
+
+        # fidelity of the physics simulation, see PhysicsProfiles
+        self.physicsProfile = getProfile(
+                msg.get('physicsProfile', DEFAULT_PROFILE))
+
+        # physics engine, see PhysicsBackends
+        backend = msg.get('physicsBackend', DEFAULT_BACKEND)
+        if backend != self.physicsBackend:
+            self._createWorld(backend)
+
+        # drawing is decoupled from stepsPerSec, see Renderer
+        self.maxFps = msg.get('maxFps', 30)
+        self.frameSkip = msg.get('frameSkip', 1)
+
+        # every step is recorded to this file if given (one file per
+        # trial, see _getTrialPath), see Trajectory and replay.py
+        self.recordPath = msg.get('recordPath', None)
+
+        # trials are written to this video file or PNG directory if given
+        self.videoPath = msg.get('videoPath', None)
+        self.videoStride = msg.get('videoStride', 1)
+        self.videoFps = msg.get('videoFps', 30)
+
+        # bounded trials
+        self.numTrials = msg.get('numTrials', 1)
+        self.maxSteps = msg.get('maxSteps', 2000)
+        self.startNoise = msg.get('startNoise', self.START_NOISE)
+        self.useMean = msg.get('useMean', True)
+        self.seed = msg.get('seed', None)
+        self.headlessRequest = msg.get('headless', self.headless)
+
+    def _createWorld(self, backend):
+        self.pushingWorld = None
+        self.maze = None
+
+        self.world = createWorld(backend)
+        self.physicsBackend = backend
+
+        self.maze = Labyrinth(self.world, self.SCALE_REAL_TO_SIM,
+                self.SCALE_REAL_TO_VIS)
+
+        # a new Labyrinth has the same walls, the field is kept
+        if self.navigationField is not None:
+            self.navigationField.labyrinth = self.maze
+
+    """
+        returns the NavigationField of the Labyrinth, computed once (or
+        loaded from the disk cache) when it is needed first
+    """
+    def _getNavigationField(self):
+        if self.navigationField is None:
+            self.navigationField = NavigationField(self.maze)
+
+        return self.navigationField
+
+    """
+        loads the object and the maze policy, so nothing a policy keeps
+        is carried over from a previous trial
+    """
+    def _loadPolicies(self):
+        self.objPolicy = self.objPolicyModule.fromSerializableDict(
+                self.objPolicyDict)
+        if self.useNavigationField:
+            self.mazePolicy = self._getNavigationField()
+        else:
+            self.mazePolicy = self.mazePolicyModule.fromSerializableDict(
+                    self.mazePolicyDict)
+
+    """
+        places the object, light and kilobots at the start of the maze,
+        the kilobots are displaced by up to startNoise if rng isn't None
+    """
+    def _resetMaze(self, rng=None):
+        # only create or destroy bodies if numKilobots or objectShape changed
+        if self.pushingWorld is None:
+            self.pushingWorld = PushingWorld(self.world,
+                    self.SCALE_REAL_TO_SIM, self.SCALE_REAL_TO_VIS,
+                    self.numKilobots, self.objectShape)
+        else:
+            self.pushingWorld.resize(self.numKilobots, self.objectShape)
+
+        self.pushingWorld.setProfile(self.physicsProfile)
+
+        self.kilobots = self.pushingWorld.kilobots
+        self.pushObject = self.pushingWorld.pushObject
 
         # fixed object start position
         objStartX = 1.25
         objStartY = 0.75
 
-        r = self.kilobots[0].RADIUS
+        r = Kilobot.RADIUS
         kilobotOffsets = array([[-r, -r], [r, -r], [-r, r], [r, r]])
 
-        self.pushObject.body.position = vec2(objStartX, objStartY) *\
-                self.SCALE_REAL_TO_SIM
-        self.pushObject.body.angle = 0
+        HALF_W = self.pushObject.HALF_W
+
+        jitter = None
+        if rng is not None:
+            jitter = rng.uniform(-self.startNoise, self.startNoise,
+                                 (self.numKilobots, 2))
 
-        # light starts over the object
-        lightPos = matrix([objStartX, objStartY])
+        # light starts over the object, kilobots start left of the object
+        self.pushingWorld.reset([objStartX, objStartY],
+                [objStartX, objStartY], kilobotOffsets,
+                kilobotStart=[objStartX - 2.0 * HALF_W, objStartY],
+                kilobotJitter=jitter)
 
-        HALF_W = self.pushObject.HALF_W
+        self.targetPos = matrix([objStartX, objStartY])
 
-        # kilobots start left of the object
-        for (i, kilobot) in zip(range(self.numKilobots), self.kilobots):
-            x = objStartX - 2.0 * HALF_W + (1 + i / 4) * kilobotOffsets[i % 4, 0]
-            y = objStartY + (1 + i / 4) * kilobotOffsets[i % 4, 1]
-            kilobot.body.position = vec2(x, y) * self.SCALE_REAL_TO_SIM
+    """
+        shows the policies until the simulator is stopped
+    """
+    def _testMazePolicy(self):
+        self._loadPolicies()
+        self._resetMaze()
+
+        renderer = Renderer(self.screen, self._draw, self.maxFps,
+                self.frameSkip)
 
-        s = asmatrix(empty((1, 2 + 2 * self.numKilobots)))
-        targetPos = matrix([objStartX, objStartY])
+        recorder = None
+        if self.recordPath is not None:
+            recorder = self._createRecorder(self.recordPath)
 
         while True:
-            """ user interaction """
-            # handle keys
-            for event in pygame.event.get():
-                if event.type == KEYDOWN:
-                    if event.key == K_PLUS:
-                        self.stepsPerSec *= 2
-                    elif event.key == K_MINUS:
-                        self.stepsPerSec = np.max([1, self.stepsPerSec / 2])
-
-            """ drawing """
-            self.screen.fill((0, 0, 0, 0))
-
-            self.maze.draw(self.screen)
-            self.pushObject.draw(self.screen)
-
-            for kilobot in self.kilobots:
-                kilobot.draw(self.screen)
-
-            # draw light
-            lx = int(self.SCALE_REAL_TO_VIS * lightPos[0, 0])
-            ly = int(self.screen.get_height() - self.SCALE_REAL_TO_VIS *
-                    lightPos[0, 1])
-            lr = int(self.SCALE_REAL_TO_VIS * 0.02)
-            gfxdraw.aacircle(self.screen, lx, ly, lr, (255, 255, 0))
-
-            objPos = self.pushObject.getRealPosition()
-
-            # draw line from object to target position
-            ox = int(self.SCALE_REAL_TO_VIS * objPos[0, 0])
-            oy = int(self.screen.get_height() - self.SCALE_REAL_TO_VIS *
-                    objPos[0, 1])
-            tx = int(self.SCALE_REAL_TO_VIS * targetPos[0, 0])
-            ty = int(self.screen.get_height() - self.SCALE_REAL_TO_VIS *
-                    targetPos[0, 1])
-
-            pygame.draw.aaline(self.screen, (0, 0, 255), (ox, oy), (tx, ty))
-
-            pygame.display.flip()
+            """ drawing (only some steps are drawn, see Renderer) """
+            if renderer.step():
+                self._handleEvents()
+
             self.clock.tick(self.stepsPerSec)
 
-            """ simulation """
-            # current state
-            s[0, 0] = lightPos[0, 0] - objPos[0, 0]
-            s[0, 1] = lightPos[0, 1] - objPos[0, 1]
+            self._step()
+
+            if recorder is not None:
+                recorder.append(self.pushingWorld.lightPos,
+                        self.pushingWorld.getPoses(), self.targetPos)
+
+    """
+        trials: indices of the trials to run (seed the start positions)
+
+        returns one dict of metrics per trial
+    """
+    def _runTrials(self, trials):
+        renderer = None
+        if not self.headlessRequest:
+            renderer = Renderer(self.screen, self._draw, self.maxFps,
+                    self.frameSkip)
+
+        results = []
+        for trial in trials:
+            rng = np.random.RandomState(None if self.seed is None
+                                        else [self.seed, trial])
+            if not self.useMean:
+                # the policy samples from the global numpy generator
+                np.random.seed(None if self.seed is None
+                               else [self.seed, trial])
+
+            # nothing of the previous trials is left in the world
+            if self.seed is not None:
+                self._createWorld(self.physicsBackend)
+
+            self._loadPolicies()
+            self._resetMaze(rng)
+
+            # the recordings are finished also if a step fails
+            recorder = None
+            video = None
+            try:
+                if self.recordPath is not None:
+                    recorder = self._createRecorder(
+                            self._getTrialPath(self.recordPath, trial))
+
+                if self.videoPath is not None:
+                    video = VideoRecorder(
+                            self._getTrialPath(self.videoPath, trial),
+                            self._draw, (self.WIDTH, self.HEIGHT),
+                            self.videoStride, self.videoFps)
+
+                result = self._runTrialSteps(renderer, recorder, video)
+            finally:
+                if recorder is not None:
+                    recorder.close()
+
+                if video is not None:
+                    video.close()
+
+            result['trial'] = trial
+            results.append(result)
+
+        return results
+
+    """
+        steps one trial until the object reaches the goal or for maxSteps
+        control steps, recorder and video may be None
+
+        returns the metrics of the trial
+    """
+    def _runTrialSteps(self, renderer, recorder, video):
+        controlStepTime = self.physicsProfile.getControlStepTime()
+
+        objPos = self.pushObject.getRealPosition()
+        pathLength = 0.0
+        collisions = 0
+        touching = False
+        stepsToGoal = None
+        numSteps = 0
+
+        for step in range(self.maxSteps):
+            numSteps = step + 1
+
+            if renderer is not None:
+                if renderer.step():
+                    self._handleEvents()
+                self.clock.tick(self.stepsPerSec)
+
+            self._step()
+
+            if recorder is not None:
+                recorder.append(self.pushingWorld.lightPos,
+                        self.pushingWorld.getPoses(), self.targetPos)
+
+            if video is not None:
+                video.step()
+
+            newObjPos = self.pushObject.getRealPosition()
+            pathLength += float(np.linalg.norm(newObjPos - objPos))
+            objPos = newObjPos
+
+            # count the hits, not the steps the object stays at a wall
+            wallDistance = self.maze.getWallDistances(
+                    self.pushObject.getRealOutline()).min()
+            if not touching and wallDistance <= self.COLLISION_DISTANCE:
+                touching = True
+                collisions += 1
+            elif touching and wallDistance > self.RELEASE_DISTANCE:
+                touching = False
+
+            if self.maze.isInGoal(objPos)[0]:
+                stepsToGoal = numSteps
+                break
+
+        return {'success': stepsToGoal is not None,
+                'stepsToGoal': stepsToGoal,
+                'timeToGoal': None if stepsToGoal is None
+                              else stepsToGoal * controlStepTime,
+                'numSteps': numSteps,
+                'pathLength': pathLength,
+                'collisions': collisions,
+                'remainingDistance': float(self._getNavigationField()
+                                           .getDistance(objPos)[0])}
+
+    """
+        returns the path of the recording or video of a trial, '{trial}'
+        in path is replaced by the trial index, otherwise the index is
+        added if there are several trials
+    """
+    def _getTrialPath(self, path, trial):
+        if '{trial}' in path:
+            return path.format(trial=trial)
+        if self.numTrials == 1:
+            return path
+
+        root, ext = os.path.splitext(path)
+        return '{}_{}{}'.format(root, trial, ext)
+
+    def _createRecorder(self, path):
+        return TrajectoryRecorder(path, 1 + self.numKilobots,
+                meta={'labyrinth': True,
+                      'objectShape': self.objectShape,
+                      'numKilobots': self.numKilobots,
+                      'stepsPerSec': self.stepsPerSec})
+
+    """
+        policyModuleSources: list of (fileName, source) of the policy
+            modules, the workers load the modules from the sources
+    """
+    def _runTrialsInPool(self, msg, policyModuleSources, objPolicyModuleName,
+            mazePolicyModuleName):
+        numTrials = msg['numTrials']
+        trials = array_split(arange(numTrials),
+                             np.clip(self.numWorkers, 1, numTrials))
+
+        tasks = [(msg, policyModuleSources, objPolicyModuleName,
+                  mazePolicyModuleName, [int(t) for t in ts])
+                 for ts in trials if len(ts) > 0]
+
+        results = []
+        for block in self.pool.imap_unordered(_runTrialsInWorker, tasks):
+            results += block
+
+        return sorted(results, key=lambda r: r['trial'])
+
+    """
+        one control step of the object and the maze policy
+    """
+    def _step(self):
+        # current state
+        objPos = self.pushObject.getRealPosition()
+        s = self.pushingWorld.getState()
+
+        # solve maze
+        targetPos = self.mazePolicy.getTargetPosition(objPos)
+        self.targetPos = targetPos
+
+        # rotate state
+        direction = targetPos - objPos
+        angle = -math.atan2(direction[0, 1], direction[0, 0])
+
+        sx = s.flat[0::2] * math.cos(angle) - s.flat[1::2] * math.sin(angle)
+        sy = s.flat[1::2] * math.cos(angle) + s.flat[0::2] * math.sin(angle)
+
+        s.flat[0::2] = sx
+        s.flat[1::2] = sy
+
+        # choose action
+        if self.useMean:
+            a = self.objPolicy.getMeanAction(s)
+        else:
+            a = asmatrix(self.objPolicy.sampleActions(s))
 
-            for (i, kilobot) in zip(range(self.numKilobots), self.kilobots):
-                kbPos = kilobot.getRealPosition()
-                s[0, 2 + 2 * i + 0] = kbPos[0, 0] - objPos[0, 0]
-                s[0, 2 + 2 * i + 1] = kbPos[0, 1] - objPos[0, 1]
+        # rotate action
+        ax = a[0, 0] * math.cos(-angle) - a[0, 1] * math.sin(-angle)
+        ay = a[0, 1] * math.cos(-angle) + a[0, 0] * math.sin(-angle)
 
-            # solve maze
-            targetPos = self.mazePolicy.getTargetPosition(objPos)
+        a[0, 0] = ax
+        a[0, 1] = ay
 
-            # rotate state
-            direction = targetPos - objPos
-            angle = -math.atan2(direction[0, 1], direction[0, 0])
+        # take action
+        self.pushingWorld.moveLight(a)
+        self.pushingWorld.step()
 
-            sx = s.flat[0::2] * math.cos(angle) - s.flat[1::2] * math.sin(angle)
-            sy = s.flat[1::2] * math.cos(angle) + s.flat[0::2] * math.sin(angle)
+    def _handleEvents(self):
+        for event in pygame.event.get():
+            if event.type == KEYDOWN:
+                if event.key == K_PLUS:
+                    self.stepsPerSec *= 2
+                elif event.key == K_MINUS:
+                    self.stepsPerSec = np.max([1, self.stepsPerSec // 2])
 
-            s.flat[0::2] = sx
-            s.flat[1::2] = sy
+    def _draw(self, screen):
+        screen.fill((0, 0, 0, 0))
 
-            # choose action
-            a = self.objPolicy.getMeanAction(s)
+        self.maze.draw(screen)
+        self.pushingWorld.draw(screen)
 
-            # rotate action
-            ax = a[0, 0] * math.cos(-angle) - a[0, 1] * math.sin(-angle)
-            ay = a[0, 1] * math.cos(-angle) + a[0, 0] * math.sin(-angle)
+        objPos = self.pushObject.getRealPosition()
 
-            a[0, 0] = ax
-            a[0, 1] = ay
+        # draw line from object to target position
+        ox = int(self.SCALE_REAL_TO_VIS * objPos[0, 0])
+        oy = int(screen.get_height() - self.SCALE_REAL_TO_VIS * objPos[0, 1])
+        tx = int(self.SCALE_REAL_TO_VIS * self.targetPos[0, 0])
+        ty = int(screen.get_height() - self.SCALE_REAL_TO_VIS *
+                self.targetPos[0, 1])
 
-            # take action
-            n = linalg.norm(a)
-            if n > 0.015:
-                lightPos += (a * 0.015 / n)
-            else:
-                lightPos += a
+        pygame.draw.aaline(screen, (0, 0, 255), (ox, oy), (tx, ty))
+
+
+"""
+    trials: metrics of the trials (see _runTrials)
+
+    returns a dict with the trials and the metrics over all trials
+"""
+def summarizeTrials(trials):
+    successful = [t for t in trials if t['success']]
+
+    def mean(values):
+        return float(np.mean(values)) if len(values) > 0 else None
+
+    return {'trials': trials,
+            'successRate': mean([t['success'] for t in trials]),
+            'meanTimeToGoal': mean([t['timeToGoal'] for t in successful]),
+            'meanPathLength': mean([t['pathLength'] for t in trials]),
+            'meanCollisions': mean([t['collisions'] for t in trials]),
+            'meanRemainingDistance': mean([t['remainingDistance']
+                                           for t in trials])}
+
+
+""" worker processes """
+_workerSim = None
+
+
+def _initWorker():
+    global _workerSim
+
+    # forked workers would otherwise draw the same random numbers
+    np.random.seed()
+
+    _workerSim = KilobotsObjectMazeSimulator(headless=True)
 
-            # move directly toward the light
-            for kilobot in self.kilobots:
-                kbPos = kilobot.getRealPosition()
 
-                v = lightPos - kbPos
+def _runTrialsInWorker(task):
+    (msg, policyModuleSources, objPolicyModuleName, mazePolicyModuleName,
+     trials) = task
 
-                # cap max velocity
-                n = linalg.norm(v)
-                if n > 0.01:
-                    v *= (0.01 / n)
+    modules = _workerSim.policyModules
+    modules.update(policyModuleSources)
+    _workerSim._readRequest(msg, modules.get(objPolicyModuleName),
+            None if mazePolicyModuleName is None
+            else modules.get(mazePolicyModuleName))
+    _workerSim.headlessRequest = True
 
-                kilobot.body.linearVelocity = vec2(v[0, 0], v[0, 1]) * \
-                        self.SCALE_REAL_TO_SIM
-                kilobot.body.linearDamping = 0.0
+    return _workerSim._runTrials(trials)
 
-            for i in range(10):
-                self.world.Step(0.1, 10, 10)
 
 if __name__ == '__main__':
-    sim = KilobotsObjectMazeSimulator()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true',
+            help='no visualisation and no frame pacing for trials (unless ' +
+                 'a request sets \'headless\' to False)')
+    parser.add_argument('--workers', type=int, default=1,
+            help='number of worker processes the trials are split across')
+    args = parser.parse_args()
+
+    sim = KilobotsObjectMazeSimulator(headless=args.headless,
+            numWorkers=args.workers)
     sim.run()
@@ -1,4 +1,4 @@
-#!/usr/bin/env python2
+#!/usr/bin/env python3
 
 """
     Multiple Kilobots move directly to the light.
@@ -17,12 +17,21 @@ from Box2D.b2 import*
 from Object import Object
 from Kilobot import Kilobot
 from Labyrinth import Labyrinth
+from PushingWorld import PushingWorld
+from StartStateCache import StartStateCache
+from PolicyModules import PolicyModuleCache, PolicyCache
+from Profiling import PhaseTimer, profileCall
 
-import random
+import argparse
 
 from zmq import Context, PAIR
 import pickle
-import importlib
+from collections import deque
+from multiprocessing import Pool
+
+from SampleStream import sendEpisodeSamples, sendSamplesEnd
+from PhysicsProfiles import getProfile, DEFAULT_PROFILE
+from PhysicsBackends import createWorld, DEFAULT_BACKEND
 
 from numpy import *
 import numpy as np
@@ -36,67 +45,289 @@ class KilobotsObjectMazeSimulator:
 
     ZMQ_PORT = 2357
 
-    def __init__(self):
-        # pygame
+    # episode start states kept across requests (see 'settleSteps')
+    START_STATE_CACHE_SIZE = 256
+
+    """
+        headless: default for requests which don't specify 'headless',
+            if True pygame is never initialized and there is no frame pacing
+        numWorkers: if > 1 the episodes of a request are split across a
+            pool of worker processes (always headless), each with its own
+            world and its own copy of the policy
+    """
+    def __init__(self, headless=False, numWorkers=1):
+        self.headless = headless
+
+        # worker processes are forked before pygame is initialized
+        self.numWorkers = numWorkers
+        self.pool = None
+        if numWorkers > 1:
+            self.pool = Pool(numWorkers, _initWorker)
+
+        # pygame (created lazily if started headless)
+        self.screen = None
+        if not self.headless:
+            self._initDisplay()
+
+        # one world per lockstep slot
+        self.pushingWorlds = []
+        self.pushingWorldsBackend = None
+
+        # epsilon greedy, seeded per lockstep group by requests with 'seed'
+        self.rng = np.random.RandomState()
+
+        self.startStates = StartStateCache(self.START_STATE_CACHE_SIZE)
+
+        # policy modules are loaded in memory, policies are deserialized
+        # once per policyDict (see PolicyModules)
+        self.policyModules = PolicyModuleCache()
+        self.policies = PolicyCache(self.policyModules)
+
+        # time per phase of a step, switched with 'setProfiling'
+        self.timer = PhaseTimer()
+        self.profilePath = None
+
+        # requests received while simulating the previous one
+        self.socket = None
+        self.pendingMessages = deque()
+
+    def _initDisplay(self):
         self.screen = pygame.display.set_mode((self.WIDTH, self.HEIGHT),
                 HWSURFACE | DOUBLEBUF, 32)
         pygame.display.set_caption('kbsim - 0.0s')
         self.clock = pygame.time.Clock()
 
-        self.world = world(gravity=(0, 0), doSleep=True)
-
+    def run(self):
         # zqm
         context = Context()
         self.socket = context.socket(PAIR)
         self.socket.connect('tcp://localhost:{}'.format(self.ZMQ_PORT))
 
-    def run(self):
         while True:
-            msg = pickle.loads(self.socket.recv())
+            if self.pendingMessages:
+                msg = self.pendingMessages.popleft()
+            else:
+                msg = pickle.loads(self.socket.recv())
 
             if msg['message'] == 'sentPolicyModules':
-                for fileName, source in msg['modules']:
-                    with open(fileName, 'w') as f:
-                        f.write(source)
-                policyModule = importlib.import_module(msg['policyModule'])
+                # only loaded again if the sources changed
+                self.policyModules.update(msg['modules'])
+                self.policyModuleSources = msg['modules']
+                self.policyModuleName = msg['policyModule']
+                self.policyModules.get(self.policyModuleName)
+            elif msg['message'] == 'setProfiling':
+                self._setProfiling(msg)
             elif msg['message'] == 'getSamples':
-                # load the policy
-                policyDict = msg['policyDict']
-                self.policy = policyModule.fromSerializableDict(policyDict)
+                # stream every episode as soon as it is finished
+                # (see SampleStream) instead of sending all samples at once
+                stream = msg.get('stream', False)
+                episodeDone = self._sendEpisodeSamples if stream else None
 
-                # read parameters
-                self.objectShape = msg['objectShape']
+                # a profile is only captured for one request
+                profilePath = self.profilePath
+                self.profilePath = None
 
-                self.numKilobots = msg['numKilobots']
-                self.numEpisodes = msg['numEpisodes']
-                self.numStepsPerEpisode = msg['numStepsPerEpisode']
-                self.stepsPerSec = msg['stepsPerSec']
+                self.timer.reset()
+                S, A, R, S_ = profileCall(profilePath, self._getSamples,
+                        msg, episodeDone)
 
-                self.epsilon = msg['epsilon']
-                self.useMean = msg['useMean']
+                timings = None
+                if self.timer.enabled:
+                    timings = self.timer.getTimings()
 
-                S, A, R, S_ = self._generateSamples()
-
-                msg = {'message': 'sentSamples',
-                       'samples': (S, A, R, S_)}
-                self.socket.send(pickle.dumps(msg, protocol=2))
+                if stream:
+                    sendSamplesEnd(self.socket, msg['numEpisodes'], timings)
+                else:
+                    msg = {'message': 'sentSamples',
+                           'samples': (S, A, R, S_)}
+                    if timings is not None:
+                        msg['timings'] = timings
+                    self.socket.send(pickle.dumps(msg, protocol=2))
             else:
                 print('got unexpected message')
 
-    def _generateSamples(self):
-        # create kilobots
-        self.kilobots = []
-        for i in range(self.numKilobots):
-            kilobot = Kilobot(self.world, self.SCALE_REAL_TO_SIM,
-                self.SCALE_REAL_TO_VIS, [0, 0])
-            kilobot.fixture.friction = 20
-
-            self.kilobots += [kilobot]
-
-        self.pushObject = Object(self.world, self.SCALE_REAL_TO_SIM,
-                self.SCALE_REAL_TO_VIS, [0, 0], self.objectShape)
-
-        numSamples = self.numEpisodes * self.numStepsPerEpisode
+    """
+        msg: {'message': 'setProfiling',
+              'enabled': if True the time of every phase of a step is
+                  measured and sent with the samples as 'timings' (see
+                  Profiling), unchanged if not given
+              'profilePath': the next getSamples request is run under
+                  cProfile and the profile is written to this file}
+    """
+    def _setProfiling(self, msg):
+        self.timer.enabled = msg.get('enabled', self.timer.enabled)
+        self.profilePath = msg.get('profilePath', None)
+
+    def _getSamples(self, msg, episodeDone):
+        if self.pool is not None:
+            return self._generateSamplesInPool(msg, episodeDone)
+
+        t = self.timer.now()
+        self._readRequest(msg, self.policies.get(self.policyModuleName,
+                msg['policyDict']))
+        self.timer.lap('policyLoad', t)
+
+        if not self.headlessRequest and self.screen is None:
+            self._initDisplay()
+
+        return self._generateSamples(episodeDone=episodeDone)
+
+    """
+        policy: the policy deserialized from msg['policyDict']
+    """
+    def _readRequest(self, msg, policy):
+        self.policy = policy
+
+        # read parameters
+        self.objectShape = msg['objectShape']
+
+        self.numKilobots = msg['numKilobots']
+        self.numEpisodes = msg['numEpisodes']
+        self.numStepsPerEpisode = msg['numStepsPerEpisode']
+        self.stepsPerSec = msg['stepsPerSec']
+
+        self.epsilon = msg['epsilon']
+        self.useMean = msg['useMean']
+
+        self.numWorlds = msg.get('numWorlds', 1)
+
+        # fidelity of the physics simulation, see PhysicsProfiles
+        self.physicsProfile = getProfile(
+                msg.get('physicsProfile', DEFAULT_PROFILE))
+
+        # physics engine, see PhysicsBackends
+        self.physicsBackend = msg.get('physicsBackend', DEFAULT_BACKEND)
+
+        self.headlessRequest = msg.get('headless', self.headless)
+
+        # the same seed gives the same samples (for the same numWorlds,
+        # independent of the number of workers and streaming)
+        self.seed = msg.get('seed', None)
+
+        # if > 0 the start formation is settled for this many steps before
+        # an episode starts, the start states are cached
+        self.settleSteps = msg.get('settleSteps', 0)
+
+    def _sendEpisodeSamples(self, ep, samples):
+        sendEpisodeSamples(self.socket, ep, samples)
+
+    """
+        receives the messages the learner sent while a request is being
+        simulated, their policies are deserialized in the background
+        (unless the request is seeded)
+
+        Only used without a pool: the workers deserialize the policy of
+        every task themselves and can't be handed a prefetched one, so with
+        --workers > 1 the next request waits in the socket until the
+        current one is finished.
+    """
+    def _pollRequests(self):
+        if self.socket is None:
+            return
+
+        while self.socket.poll(0):
+            msg = pickle.loads(self.socket.recv())
+            self.pendingMessages.append(msg)
+
+            # the policy module may change with the pending messages
+            if any(m['message'] == 'sentPolicyModules'
+                   for m in self.pendingMessages):
+                continue
+
+            # a policy which draws random numbers while it is built would
+            # change the samples of the seeded request being simulated
+            if self.seed is not None:
+                continue
+
+            if msg['message'] == 'getSamples':
+                self.policies.prefetch(self.policyModuleName,
+                                       msg['policyDict'])
+
+    """
+        episodeDone: called as episodeDone(ep, (S, A, R, S_)) for every
+            finished episode, if not None
+    """
+    def _generateSamplesInPool(self, msg, episodeDone=None):
+        numEpisodes = msg['numEpisodes']
+        numStepsPerEpisode = msg['numStepsPerEpisode']
+
+        # tasks consist of whole lockstep groups, the random numbers are
+        # seeded per group, so the samples don't depend on the split
+        numWorlds = max(1, msg.get('numWorlds', 1))
+        groups = [arange(numEpisodes)[start:start + numWorlds]
+                  for start in range(0, numEpisodes, numWorlds)]
+
+        if episodeDone is None:
+            # contiguous blocks of groups, one task per worker
+            episodes = [concatenate([groups[g] for g in block])
+                        for block in array_split(arange(len(groups)),
+                                                 self.numWorkers)
+                        if len(block) > 0]
+        else:
+            # one lockstep group per task, so episodes are finished early
+            episodes = groups
+
+        # the workers load the policy modules from the sources and
+        # deserialize the policy (no prefetch, see _pollRequests)
+        tasks = [(msg, self.policyModuleSources, self.policyModuleName,
+                  list(eps), self.timer.enabled)
+                 for eps in episodes if len(eps) > 0]
+
+        blocks = {}
+        for (eps, samples, timings) in self.pool.imap_unordered(
+                _generateSamplesInWorker, tasks):
+            if timings is not None:
+                self.timer.merge(timings)
+
+            if episodeDone is not None:
+                for (k, ep) in enumerate(eps):
+                    rows = slice(k * numStepsPerEpisode,
+                                 (k + 1) * numStepsPerEpisode)
+                    episodeDone(ep, tuple(x[rows, :] for x in samples))
+
+            blocks[eps[0]] = samples
+
+        # merge the blocks in episode order
+        blocks = [blocks[ep] for ep in sorted(blocks)]
+        return tuple(vstack([b[i] for b in blocks]) for i in range(4))
+
+    """
+        episodes: indices of the episodes to simulate, all if None
+        episodeDone: called as episodeDone(ep, (S, A, R, S_)) for every
+            finished episode, if not None
+
+        The episodes are simulated in groups of numWorlds independent worlds
+        which are stepped in lockstep, so the policy is evaluated once per
+        step for the stacked states of all worlds in the group.
+    """
+    def _generateSamples(self, episodes=None, episodeDone=None):
+        if episodes is None:
+            episodes = range(self.numEpisodes)
+        episodes = list(episodes)
+
+        numWorlds = np.clip(self.numWorlds, 1, len(episodes))
+
+        # one world per lockstep slot, the bodies are kept across requests
+        # and only changed if numKilobots or objectShape change
+        if self.pushingWorldsBackend != self.physicsBackend:
+            self.pushingWorlds = []
+            self.pushingWorldsBackend = self.physicsBackend
+
+        while len(self.pushingWorlds) < numWorlds:
+            self.pushingWorlds += [PushingWorld(
+                    createWorld(self.physicsBackend),
+                    self.SCALE_REAL_TO_SIM, self.SCALE_REAL_TO_VIS,
+                    self.numKilobots, self.objectShape)]
+
+        pushingWorlds = self.pushingWorlds[:numWorlds]
+        for w in pushingWorlds:
+            w.resize(self.numKilobots, self.objectShape)
+            w.setProfile(self.physicsProfile)
+
+        numSamples = len(episodes) * self.numStepsPerEpisode
+
+        # see Profiling
+        timer = self.timer
 
         # fixed object start position
         objStartX = 1.0
@@ -104,12 +335,13 @@ class KilobotsObjectMazeSimulator:
         objStart = array([objStartX, objStartY])
 
         # kilobots start in a circel around the object
-        r = 1.5 * self.pushObject.HALF_W
-        A = linspace(0, 2 * math.pi, self.numEpisodes + 1)[0:self.numEpisodes]
-        startPositions = c_[objStartX + np.cos(A) * r,
-                            objStartY + np.sin(A) * r];
+        r = 1.5 * Object.HALF_W
+        angles = linspace(0, 2 * math.pi,
+                          self.numEpisodes + 1)[0:self.numEpisodes]
+        startPositions = c_[objStartX + np.cos(angles) * r,
+                            objStartY + np.sin(angles) * r];
 
-        r = self.kilobots[0].RADIUS
+        r = Kilobot.RADIUS
         kilobotOffsets = array([[-r, -r], [r, -r], [-r, r], [r, r]])
 
         # s: light.x light.y kb.x1 kb.y1 ... kb.xn kb.yn
@@ -120,126 +352,200 @@ class KilobotsObjectMazeSimulator:
         R = asmatrix(empty((numSamples, 1)))
         S_ = asmatrix(empty((numSamples, 2 + 2 * self.numKilobots)))
 
-        for ep in range(startPositions.shape[0]):
-            self.pushObject.body.position = vec2(objStartX, objStartY) *\
-                    self.SCALE_REAL_TO_SIM
-            self.pushObject.body.angle = 0
+        for groupStart in range(0, len(episodes), numWorlds):
+            group = episodes[groupStart:groupStart + numWorlds]
+            worlds = pushingWorlds[:len(group)]
 
-            # light starts in circel around the object
-            start = startPositions[ep, :]
-            lightPos = matrix(start)
+            if self.seed is not None:
+                # the policy samples from the global numpy generator
+                self.rng.seed([self.seed, group[0]])
+                np.random.seed([self.seed, group[0]])
 
-            # kilobots start at the light position in a fixed formation
-            for (i, kilobot) in zip(range(self.numKilobots), self.kilobots):
-                x = start[0] + (1 + i / 4) * kilobotOffsets[i % 4, 0]
-                y = start[1] + (1 + i / 4) * kilobotOffsets[i % 4, 1]
-                kilobot.body.position = vec2(x, y) * self.SCALE_REAL_TO_SIM
+            # light starts in circel around the object
+            for (w, ep) in zip(worlds, group):
+                self._resetWorld(w, objStart, startPositions[ep, :],
+                                 kilobotOffsets, angles[ep])
 
             for step in range(self.numStepsPerEpisode):
-                """ user interaction """
-                # handle keys
-                for event in pygame.event.get():
-                    if event.type == KEYDOWN:
-                        if event.key == K_PLUS:
-                            self.stepsPerSec *= 2
-                        elif event.key == K_MINUS:
-                            self.stepsPerSec = np.max([1, self.stepsPerSec / 2])
+                t = timer.now()
 
-                """ drawing """
-                self.screen.fill((0, 0, 0, 0))
+                if not self.headlessRequest:
+                    self._handleEvents()
+                    t = timer.lap('events', t)
 
-                self.pushObject.draw(self.screen)
+                    # including the frame pacing
+                    self._draw(worlds[0], group[0], step)
+                    t = timer.lap('draw', t)
 
-                for kilobot in self.kilobots:
-                    kilobot.draw(self.screen)
+                """ simulation """
+                # current state of all worlds
+                objPosOld = [w.pushObject.getRealPosition() for w in worlds]
+                s = vstack([w.getState() for w in worlds])
+                t = timer.lap('state', t)
 
-                # draw light
-                lx = int(self.SCALE_REAL_TO_VIS * lightPos[0, 0])
-                ly = int(self.screen.get_height() - self.SCALE_REAL_TO_VIS *
-                        lightPos[0, 1])
-                lr = int(self.SCALE_REAL_TO_VIS * 0.02)
-                gfxdraw.aacircle(self.screen, lx, ly, lr, (255, 255, 0))
+                # choose actions
+                a = self._chooseActions(s)
+                t = timer.lap('policy', t)
 
-                pygame.display.set_caption(('ep: {} - step: {} - ' +
-                    'stepsPerSec: {}').format(ep + 1, step + 1, self.stepsPerSec))
+                # take actions
+                for (k, w) in enumerate(worlds):
+                    w.moveLight(a[k, :])
+                    w.moveTowardLight()
+                t = timer.lap('velocities', t)
 
-                pygame.display.flip()
-                self.clock.tick(self.stepsPerSec)
+                for w in worlds:
+                    w.stepPhysics()
+                t = timer.lap('physics', t)
 
-                """ simulation """
-                # current state
-                objPos = self.pushObject.getRealPosition()
-                objPosOld = objPos
-
-                s = asmatrix(empty((1, S.shape[1])))
-                s[0, 0] = lightPos[0, 0] - objPos[0, 0]
-                s[0, 1] = lightPos[0, 1] - objPos[0, 1]
-
-                for (i, kilobot) in zip(range(self.numKilobots), self.kilobots):
-                    kbPos = kilobot.getRealPosition()
-                    s[0, 2 + 2 * i + 0] = kbPos[0, 0] - objPos[0, 0]
-                    s[0, 2 + 2 * i + 1] = kbPos[0, 1] - objPos[0, 1]
-
-                # choose action
-                if self.useMean:
-                    a = self.policy.getMeanAction(s)
-                else:
-                    if random.random() <= self.epsilon:
-                        a = self.policy.getRandomAction()
-                    else:
-                        a = self.policy.sampleActions(s)
-
-                # take action
-                n = linalg.norm(a)
-                if n > 0.015:
-                    lightPos += (a * 0.015 / n)
-                else:
-                    lightPos += a
+                for w in worlds:
+                    w.swarm.update()
+                t = timer.lap('swarmUpdate', t)
 
-                # move directly toward the light
-                for kilobot in self.kilobots:
-                    kbPos = kilobot.getRealPosition()
+                # next state
+                s_ = vstack([w.getState() for w in worlds])
 
-                    v = lightPos - kbPos
+                for (k, w) in enumerate(worlds):
+                    # reward: learn to move the object to the right
+                    objMovement = w.pushObject.getRealPosition() - objPosOld[k]
+                    r = objMovement[0, 0] - 0.5 * np.abs(objMovement[0, 1])
 
-                    # cap max velocity
-                    n = linalg.norm(v)
-                    if n > 0.01:
-                        v *= (0.01 / n)
+                    # record sample
+                    epIdx = groupStart + k
+                    sampleIdx = epIdx * self.numStepsPerEpisode + step
 
-                    kilobot.body.linearVelocity = vec2(v[0, 0], v[0, 1]) * \
-                            self.SCALE_REAL_TO_SIM
-                    kilobot.body.linearDamping = 0.0
+                    S[sampleIdx, :] = s[k, :]
+                    A[sampleIdx, :] = a[k, :]
+                    R[sampleIdx, :] = r
+                    S_[sampleIdx, :] = s_[k, :]
+                t = timer.lap('samples', t)
 
-                for i in range(10):
-                    self.world.Step(0.1, 10, 10)
+            if episodeDone is not None:
+                for (k, ep) in enumerate(group):
+                    epIdx = groupStart + k
+                    rows = slice(epIdx * self.numStepsPerEpisode,
+                                 (epIdx + 1) * self.numStepsPerEpisode)
+                    episodeDone(ep, (S[rows, :], A[rows, :], R[rows, :],
+                                     S_[rows, :]))
 
-                # next state
-                objPos = self.pushObject.getRealPosition()
+            self._pollRequests()
+
+        return S, A, R, S_
 
-                s_ = asmatrix(empty((1, S.shape[1])))
-                s_[0, 0] = lightPos[0, 0] - objPos[0, 0]
-                s_[0, 1] = lightPos[0, 1] - objPos[0, 1]
+    """
+        places object, light and kilobots for a new episode (settled if
+        self.settleSteps > 0), start states come from the cache if possible
 
-                for (i, kilobot) in zip(range(self.numKilobots), self.kilobots):
-                    kbPos = kilobot.getRealPosition()
-                    s_[0, 2 + 2 * i + 0] = kbPos[0, 0] - objPos[0, 0]
-                    s_[0, 2 + 2 * i + 1] = kbPos[0, 1] - objPos[0, 1]
+        For seeded requests the start state is always restored into a
+        rebuilt world, so nothing of the previous episodes is left and a
+        cached start state continues like a new one.
+    """
+    def _resetWorld(self, pushingWorld, objStart, lightStart, kilobotOffsets,
+            angle):
+        key = (self.numKilobots, self.objectShape, round(angle, 12),
+               pushingWorld.getFrictions(), self.physicsProfile.name,
+               self.physicsBackend, self.settleSteps)
 
-                # reward: learn to move the object to the right
-                objMovement = objPos - objPosOld
-                r = objMovement[0, 0] - 0.5 * np.abs(objMovement[0, 1])
+        snapshot = self.startStates.get(key)
+        if snapshot is None:
+            # settling has to start from a fresh world as well
+            if self.seed is not None and self.settleSteps > 0:
+                pushingWorld.rebuild()
 
-                # record sample
-                sampleIdx = ep * self.numStepsPerEpisode + step
+            pushingWorld.reset(objStart, lightStart, kilobotOffsets)
+            if self.settleSteps > 0:
+                pushingWorld.settle(self.settleSteps)
 
-                S[sampleIdx, :] = s
-                A[sampleIdx, :] = a
-                R[sampleIdx, :] = r
-                S_[sampleIdx, :] = s_
+            snapshot = pushingWorld.getSnapshot()
+            self.startStates.put(key, snapshot)
+
+        if self.seed is not None:
+            pushingWorld.rebuild()
+        pushingWorld.restoreSnapshot(snapshot)
+
+    """
+        s: states of all worlds, one per row
+
+        returns one action per row
+    """
+    def _chooseActions(self, s):
+        if self.useMean:
+            return asmatrix(self.policy.getMeanAction(s))
+
+        a = asmatrix(empty((s.shape[0], 2)))
+
+        # epsilon greedy for each world
+        isRandom = self.rng.random_sample(s.shape[0]) <= self.epsilon
+
+        for k in flatnonzero(isRandom):
+            a[k, :] = self.policy.getRandomAction()
+
+        if not isRandom.all():
+            a[~isRandom, :] = self.policy.sampleActions(s[~isRandom, :])
+
+        return a
+
+    def _handleEvents(self):
+        for event in pygame.event.get():
+            if event.type == KEYDOWN:
+                if event.key == K_PLUS:
+                    self.stepsPerSec *= 2
+                elif event.key == K_MINUS:
+                    self.stepsPerSec = np.max([1, self.stepsPerSec // 2])
+
+    def _draw(self, pushingWorld, ep, step):
+        self.screen.fill((0, 0, 0, 0))
+
+        pushingWorld.draw(self.screen)
+
+        pygame.display.set_caption(('ep: {} - step: {} - ' +
+            'stepsPerSec: {}').format(ep + 1, step + 1, self.stepsPerSec))
+
+        pygame.display.flip()
+        self.clock.tick(self.stepsPerSec)
+
+
+""" worker processes """
+_workerSim = None
+
+
+def _initWorker():
+    global _workerSim
+
+    # forked workers would otherwise draw the same random numbers
+    np.random.seed()
+
+    _workerSim = KilobotsObjectMazeSimulator(headless=True)
+
+
+def _generateSamplesInWorker(task):
+    msg, policyModuleSources, policyModuleName, episodes, profiling = task
+
+    timer = _workerSim.timer
+    timer.enabled = profiling
+    timer.reset()
+
+    t = timer.now()
+    _workerSim.policyModules.update(policyModuleSources)
+    _workerSim._readRequest(msg, _workerSim.policies.get(policyModuleName,
+            msg['policyDict']))
+    _workerSim.headlessRequest = True
+    timer.lap('policyLoad', t)
+
+    samples = _workerSim._generateSamples(episodes)
+
+    return (episodes, samples,
+            timer.getTimings() if profiling else None)
 
-        return S, A, R, S_
 
 if __name__ == '__main__':
-    sim = KilobotsObjectMazeSimulator()
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--headless', action='store_true',
+            help='no visualisation and no frame pacing (unless a request ' +
+                 'sets \'headless\' to False)')
+    parser.add_argument('--workers', type=int, default=1,
+            help='number of worker processes the episodes are split across')
+    args = parser.parse_args()
+
+    sim = KilobotsObjectMazeSimulator(headless=args.headless,
+            numWorkers=args.workers)
     sim.run()
@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+
+"""
+    Serves many learners at once from one simulator host.
+
+    Learners connect DEALER sockets (see SimulationClient) to the ROUTER
+    socket of the server and send the same pickled messages as to the
+    simulate scripts:
+
+        sentPolicyModules: kept per learner, used by its later requests
+        getSamples: answered with 'sentSamples' (see
+            simulate_single_direction.py, always headless, 'stream' is not
+            supported)
+        testMaze: with 'numTrials', answered with 'testMazeResults' (see
+            simulate_maze.py, always headless)
+
+    Every request may carry a 'requestId', the answer has the same
+    'requestId' (the server numbers requests without one), so a learner
+    can have several requests running. Requests are queued in the order
+    they arrive and handed to a pool of worker processes, each request is
+    simulated by one worker. A failed request is answered with
+    {'message': 'error', 'requestId': ..., 'error': description}.
+
+    The server only listens on localhost by default (--bind): requests
+    are unpickled and the policy modules are executed, so anyone who can
+    connect can run code on the simulator host. Only bind to other
+    interfaces in a trusted network.
+
+    Like the simulate scripts, the workers load the policy modules in
+    memory (see PolicyModules). A module is loaded again when a request
+    comes with a different source for it, so learners which send different
+    sources under the same module name are served correctly, but faster
+    with different module names.
+"""
+
+import simulate_single_direction
+import simulate_maze
+from PolicyModules import PolicyModuleCache, PolicyCache
+
+import argparse
+import asyncio
+import multiprocessing
+import os
+import pickle
+import threading
+import time
+import traceback
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import zmq
+import zmq.asyncio
+
+
+class SimulationServer:
+    ZMQ_PORT = 2359
+    BIND_ADDRESS = '127.0.0.1'
+
+    """
+        port: port the ROUTER socket is bound to
+        bindAddress: interface the ROUTER socket is bound to, '*' for all
+        numWorkers: number of worker processes, requests are simulated in
+            parallel up to this number
+    """
+    def __init__(self, port=ZMQ_PORT, numWorkers=4,
+            bindAddress=BIND_ADDRESS):
+        self.port = port
+        self.bindAddress = bindAddress
+        self.numWorkers = numWorkers
+
+        # sentPolicyModules message of every learner (by identity)
+        self.policyModules = {}
+
+        self.nextRequestId = 0
+
+        self.numRequests = 0
+        self.numFailed = 0
+
+    def run(self):
+        # the workers are forked before the zmq context, the socket and the
+        # event loop exist, so they don't inherit any of them
+        self._startWorkers()
+
+        asyncio.run(self.serve())
+
+    """
+        creates the process pool and forks all of its workers
+    """
+    def _startWorkers(self):
+        fork = multiprocessing.get_context('fork')
+
+        # the executor only forks a new worker if no worker is idle, every
+        # worker blocks in the barrier until all of them are started
+        barrier = fork.Barrier(self.numWorkers)
+        self.executor = ProcessPoolExecutor(self.numWorkers, mp_context=fork,
+                initializer=_initWorker, initargs=(barrier,))
+
+        started = [self.executor.submit(_waitForWorkers)
+                   for i in range(self.numWorkers)]
+        for f in started:
+            f.result()
+
+    async def serve(self):
+        context = zmq.asyncio.Context()
+        self.socket = context.socket(zmq.ROUTER)
+        self.socket.bind('tcp://{}:{}'.format(self.bindAddress, self.port))
+
+        self.queue = asyncio.Queue()
+
+        dispatchers = [asyncio.ensure_future(self._dispatch())
+                       for i in range(self.numWorkers)]
+
+        try:
+            while True:
+                frames = await self.socket.recv_multipart()
+                if len(frames) < 2:
+                    continue
+
+                # the routing frames (identity and the empty delimiter of
+                # REQ sockets) are sent back with the answers
+                identity = tuple(frames[:-1])
+
+                try:
+                    msg = pickle.loads(frames[-1])
+                except Exception as e:
+                    self._sendError(identity, {},
+                            'message could not be unpickled: {}'.format(e))
+                    continue
+
+                if not isinstance(msg, dict) or 'message' not in msg:
+                    self._sendError(identity, {},
+                            'a message has to be a dict with \'message\'')
+                    continue
+
+                self._receive(identity, msg)
+        finally:
+            for d in dispatchers:
+                d.cancel()
+            self.executor.shutdown(wait=False)
+            self.socket.close()
+
+    def _receive(self, identity, msg):
+        if msg['message'] == 'sentPolicyModules':
+            self.policyModules[identity] = msg
+            return
+
+        if msg.get('requestId', None) is None:
+            msg['requestId'] = self.nextRequestId
+            self.nextRequestId += 1
+
+        modules = self.policyModules.get(identity, None)
+        if msg['message'] not in ('getSamples', 'testMaze'):
+            self._sendError(identity, msg, 'unknown message \'{}\''
+                    .format(msg['message']))
+        elif modules is None:
+            self._sendError(identity, msg, 'no policy modules were sent')
+        elif msg['message'] == 'testMaze' and 'numTrials' not in msg:
+            self._sendError(identity, msg, 'testMaze needs \'numTrials\'')
+        elif msg.get('stream', False):
+            self._sendError(identity, msg, 'streaming is not supported')
+        else:
+            self.queue.put_nowait((identity, msg, modules))
+
+    """
+        takes the next request from the queue, simulates it in a worker
+        and sends the answer, one dispatcher per worker
+    """
+    async def _dispatch(self):
+        loop = asyncio.get_event_loop()
+
+        while True:
+            identity, msg, modules = await self.queue.get()
+
+            try:
+                answer = await loop.run_in_executor(self.executor,
+                        _handleRequestInWorker, (msg, modules))
+            except Exception:
+                self._sendError(identity, msg, traceback.format_exc())
+                continue
+
+            answer['requestId'] = msg['requestId']
+            self.numRequests += 1
+            self._send(identity, answer)
+
+    def _send(self, identity, msg):
+        self.socket.send_multipart(list(identity) +
+                                   [pickle.dumps(msg, protocol=2)])
+
+    def _sendError(self, identity, msg, error):
+        self.numFailed += 1
+        self._send(identity, {'message': 'error',
+                              'requestId': msg.get('requestId', None),
+                              'error': error})
+
+
+""" worker processes """
+_workerSims = {}
+_workerModules = PolicyModuleCache()
+_workerPolicies = PolicyCache(_workerModules)
+_workerBarrier = None
+
+
+def _initWorker(barrier):
+    global _workerBarrier
+    _workerBarrier = barrier
+
+    # forked workers would otherwise draw the same random numbers
+    np.random.seed()
+
+    # the pool isn't shut down if the server is killed
+    watchdog = threading.Thread(target=_exitWithServer, args=(os.getppid(),))
+    watchdog.daemon = True
+    watchdog.start()
+
+
+def _waitForWorkers():
+    _workerBarrier.wait()
+
+
+def _exitWithServer(server):
+    while os.getppid() == server:
+        time.sleep(1.0)
+
+    os._exit(0)
+
+
+def _getWorkerSim(module):
+    if module not in _workerSims:
+        _workerSims[module] = module.KilobotsObjectMazeSimulator(
+                headless=True)
+
+    return _workerSims[module]
+
+
+def _handleRequestInWorker(task):
+    msg, modules = task
+
+    # only loaded again if the sources changed
+    _workerModules.update(modules['modules'])
+
+    if msg['message'] == 'getSamples':
+        sim = _getWorkerSim(simulate_single_direction)
+        sim._readRequest(msg, _workerPolicies.get(modules['policyModule'],
+                msg['policyDict']))
+        sim.headlessRequest = True
+
+        return {'message': 'sentSamples', 'samples': sim._generateSamples()}
+    else:
+        sim = _getWorkerSim(simulate_maze)
+        mazePolicyModule = modules.get('mazePolicyModule', None)
+        sim._readRequest(msg, _workerModules.get(modules['objPolicyModule']),
+                None if mazePolicyModule is None
+                else _workerModules.get(mazePolicyModule))
+        sim.headlessRequest = True
+
+        results = simulate_maze.summarizeTrials(
+                sim._runTrials(range(sim.numTrials)))
+        results['message'] = 'testMazeResults'
+        return results
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--port', type=int, default=SimulationServer.ZMQ_PORT,
+            help='port the learners connect to')
+    parser.add_argument('--bind', default=SimulationServer.BIND_ADDRESS,
+            help='interface to listen on, \'*\' for all (only in a trusted ' +
+                 'network, requests can execute code)')
+    parser.add_argument('--workers', type=int, default=4,
+            help='number of worker processes (requests simulated at once)')
+    args = parser.parse_args()
+
+    server = SimulationServer(port=args.port, numWorkers=args.workers,
+                              bindAddress=args.bind)
+    server.run()